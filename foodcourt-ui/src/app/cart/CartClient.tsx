@@ -152,7 +152,7 @@ export default function CartClient() {
         <div className="text-sm">
           <p className="font-medium text-amber-900">MVP Demo Mode</p>
           <p className="text-amber-700">
-            Payment is simulated. After checkout, use the "Mark Paid (Dev)" button on the order page.
+            Payment is simulated. After checkout, run scripts/fake_gateway.py to send the payment webhook.
           </p>
         </div>
       </div>
@@ -35,19 +35,8 @@ export default function OrderClient({ orderId }: { orderId: number }) {
         <div>Total: ₹{st.total_gross}</div>
       </div>
 
-      {/* Dev helper for MVP (simulates payment webhook) */}
-      <button
-        className="rounded-lg border px-3 py-2 hover:bg-gray-50"
-        onClick={async () => {
-          await fetch(`${process.env.NEXT_PUBLIC_API_BASE}/orders/${orderId}/mark-paid`, { method: "POST" });
-          await refresh();
-        }}
-      >
-        Mark Paid (Dev)
-      </button>
-
       <div className="text-sm text-gray-500">
-        In real flow, this updates automatically via a payment webhook.
+        Status updates automatically once the payment is confirmed.
       </div>
     </div>
   );
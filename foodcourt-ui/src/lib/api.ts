@@ -1,11 +1,15 @@
 // foodcourt-ui/src/lib/api.ts
 const BASE = process.env.NEXT_PUBLIC_API_BASE!;
+// Food court this UI serves; unset for the default court (or when the backend maps it by host)
+const COURT = process.env.NEXT_PUBLIC_COURT_ID;
+const COURT_HEADERS: Record<string, string> = COURT ? { "X-Court-Id": COURT } : {};
 
 async function http<T>(url: string, init?: RequestInit): Promise<T> {
   const res = await fetch(url, { 
     ...init, 
     headers: { 
       "Content-Type": "application/json", 
+      ...COURT_HEADERS,
       ...(init?.headers||{}) 
     } 
   });
@@ -16,11 +20,44 @@ async function http<T>(url: string, init?: RequestInit): Promise<T> {
   return res.json() as Promise<T>;
 }
 
+// Follows X-Next-Cursor pages of a list endpoint and concatenates them
+async function httpAll<T>(url: string, limit = 200): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const sep = url.includes("?") ? "&" : "?";
+    const pageUrl: string = `${url}${sep}limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`;
+    const res = await fetch(pageUrl, { headers: { "Content-Type": "application/json", ...COURT_HEADERS } });
+    if (!res.ok) {
+      const text = await res.text();
+      throw new Error(`${res.status} ${res.statusText}: ${text}`);
+    }
+    items.push(...((await res.json()) as T[]));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
+}
+
 export type AuthOut = { user_token: string; user_id: number; email: string; display_name?: string };
 export type Vendor = { id: number; name: string; stall_no?: string | null };
-export type Menu = { id: number; vendor_id: number; item_name: string; price: string; is_active: boolean };
+export type Menu = { id: number; vendor_id: number; item_name: string; category: string; price: string; is_active: boolean };
+export type MenuSearch = { items: Menu[]; total: number; next_cursor?: string | null };
+export type MenuSuggestion = { menu_id: number; vendor_id: number; item_name: string; category: string };
+export type MenuSearchParams = {
+  q?: string;
+  category?: string;
+  vendor_id?: number;
+  min_price?: number;
+  max_price?: number;
+  cursor?: string;
+  limit?: number;
+};
 export type CartItem = { id: number; vendor_id: number; menu_id: number; item_name: string; qty: number; price_each: string; line_total: string };
-export type Cart = { cart_id: number; user_token: string; items: CartItem[]; subtotal: string };
+export type Cart = { cart_id: number; user_token: string; items: CartItem[]; subtotal: string; version: number };
+export type CartOp =
+  | { op: "add"; menu_id: number; qty?: number }
+  | { op: "remove"; menu_id?: number; cart_item_id?: number }
+  | { op: "set_qty"; menu_id?: number; cart_item_id?: number; qty: number };
 export type CheckoutResp = { order_id: number; status: string; payable_amount: string; payment_link: string };
 export type OrderStatus = { order_id: number; status: string; total_gross: string };
 export type OrderLineBrief = { vendor_name: string; item_name: string; qty: number; line_total: string };
@@ -33,25 +70,37 @@ export type OrderHistoryItem = {
   vendors: string[];
   lines: OrderLineBrief[];
 };
-export type OrderHistory = { user_token: string; orders: OrderHistoryItem[] };
+export type OrderHistory = { user_token: string; orders: OrderHistoryItem[]; next_cursor?: string | null };
 
 // ============= Existing Customer API =============
 export const api = {
-  vendors: () => http<Vendor[]>(`${BASE}/catalog/vendors`),
+  vendors: () => httpAll<Vendor>(`${BASE}/catalog/vendors`),
   menus: (vendor_id?: number) => {
     const q = vendor_id ? `?vendor_id=${vendor_id}` : "";
-    return http<Menu[]>(`${BASE}/catalog/menus${q}`);
+    return httpAll<Menu>(`${BASE}/catalog/menus${q}`);
+  },
+  searchMenus: (params: MenuSearchParams) => {
+    const qs = new URLSearchParams();
+    Object.entries(params).forEach(([k, v]) => { if (v !== undefined && v !== "") qs.set(k, String(v)); });
+    return http<MenuSearch>(`${BASE}/catalog/search?${qs}`);
   },
+  suggestMenus: (q: string, limit = 10) =>
+    http<MenuSuggestion[]>(`${BASE}/catalog/suggest?q=${encodeURIComponent(q)}&limit=${limit}`),
   getCart: (user_token: string) => http<Cart>(`${BASE}/cart?user_token=${user_token}`),
   addToCart: (user_token: string, menu_id: number, qty = 1) =>
     http<Cart>(`${BASE}/cart/add`, { method: "POST", body: JSON.stringify({ user_token, menu_id, qty }) }),
   removeFromCart: (user_token: string, cart_item_id: number) =>
     http<Cart>(`${BASE}/cart/remove`, { method: "POST", body: JSON.stringify({ user_token, cart_item_id }) }),
+  // Apply several taps at once; fails with 409 if `version` is stale (re-fetch and retry)
+  batchCart: (user_token: string, version: number, ops: CartOp[]) =>
+    http<Cart>(`${BASE}/cart/batch`, { method: "POST", body: JSON.stringify({ user_token, version, ops }) }),
   checkout: (user_token: string) =>
     http<CheckoutResp>(`${BASE}/checkout`, { method: "POST", body: JSON.stringify({ user_token }) }),
   orderStatus: (order_id: number) => http<OrderStatus>(`${BASE}/orders/${order_id}`),
-  history: (user_token: string) =>
-    http<OrderHistory>(`${BASE}/orders/history?user_token=${encodeURIComponent(user_token)}`),
+  history: (user_token: string, cursor?: string) =>
+    http<OrderHistory>(
+      `${BASE}/orders/history?user_token=${encodeURIComponent(user_token)}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`
+    ),
   signup: (email: string, password: string, display_name?: string, guest_token?: string) =>
     http<AuthOut>(`${BASE}/auth/signup`, {
       method: "POST",
@@ -92,7 +141,7 @@ export const vendorApi = {
 
   // Menu Management
   getMenu: (vendorId: number) =>
-    http<Menu[]>(`${BASE}/vendor/${vendorId}/menu`),
+    httpAll<Menu>(`${BASE}/vendor/${vendorId}/menu`),
 
   addMenuItem: (vendorId: number, item: { item_name: string; price: number; category?: string; is_active?: boolean }) =>
     http<Menu>(`${BASE}/vendor/${vendorId}/menu`, {
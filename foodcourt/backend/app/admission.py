@@ -0,0 +1,188 @@
+# foodcourt/backend/app/admission.py
+"""
+Admission control for the hot write routes (checkout, cart, auth) and analytics.
+
+Two checks run before the handler gets a threadpool thread or a DB connection:
+
+1. per-client token buckets, answered with 429 + Retry-After when empty. A
+   request carrying a user_token (query or JSON body) gets that token's bucket,
+   so shoppers behind one NAT do not throttle each other. The token is not
+   authenticated, though, so every such request also draws on an aggregate
+   bucket for its client IP, ADMISSION_IP_MULTIPLIER times the class's size:
+   rotating tokens buys at most that much. Requests without a token (login,
+   signup) are keyed by IP alone; email is never a key, so a third party cannot
+   drain a victim's login bucket. The client IP is the peer address, or the
+   nearest X-Forwarded-For hop outside ADMISSION_TRUSTED_PROXIES when the peer
+   is one of those proxies;
+2. a per-process concurrency limiter with route classes. Lower-priority classes
+   must leave `headroom` slots free, so analytics is shed long before checkout.
+   Rejections are an immediate 503 + Retry-After rather than a queue.
+
+Bucket state lives in a BucketStore. The in-memory store is per process; set
+ADMISSION_REDIS_URL to share buckets across workers.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+import ipaddress
+from math import ceil
+import threading
+import time
+from fastapi import HTTPException, Request
+from app.db import settings
+from app.tenancy import request_user_token
+
+@dataclass(frozen=True)
+class RouteClass:
+    rate: float          # tokens per second per client
+    burst: int           # bucket size per client
+    max_inflight: int    # concurrent requests of this class per process
+    headroom: int        # global slots this class must leave free for higher priorities
+
+ROUTE_CLASSES = {
+    "checkout": RouteClass(rate=0.5, burst=5, max_inflight=16, headroom=0),
+    "cart": RouteClass(rate=5, burst=20, max_inflight=16, headroom=4),
+    "auth": RouteClass(rate=0.2, burst=5, max_inflight=4, headroom=4),  # argon2 is CPU-heavy
+    "analytics": RouteClass(rate=1, burst=10, max_inflight=4, headroom=12),
+}
+
+# ---- Token buckets ----
+class BucketStore(ABC):
+    """Shared token-bucket state. take() returns 0 if a token was taken,
+    otherwise the seconds until one is available."""
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: int) -> float: ...
+
+class InMemoryBucketStore(BucketStore):
+    def __init__(self, max_keys: int = 100_000, idle_seconds: float = 600):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated_at)
+        self._max_keys = max_keys
+        self._idle_seconds = idle_seconds  # longer than any class takes to refill
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self._max_keys:
+                self._evict_idle(now)
+        return wait
+
+    def _evict_idle(self, now: float):
+        # An idle bucket has refilled completely and carries no state worth keeping
+        for k, (_, updated) in list(self._buckets.items()):
+            if now - updated > self._idle_seconds:
+                del self._buckets[k]
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared by all workers. Requires the optional `redis` package."""
+    _SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[2])
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'u') or ARGV[3])
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    tokens = math.min(burst, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 't', tokens, 'u', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self._SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        return float(self._take(keys=[f"fc:bucket:{key}"], args=[rate, burst, time.time()]))
+
+# ---- Concurrency ----
+class ConcurrencyLimiter:
+    def __init__(self, capacity: int, classes: dict[str, RouteClass]):
+        self.capacity = capacity
+        self._classes = classes
+        self._lock = threading.Lock()
+        self._total = 0
+        self._inflight = {name: 0 for name in classes}
+
+    def try_acquire(self, name: str) -> bool:
+        rc = self._classes[name]
+        with self._lock:
+            if self._inflight[name] >= rc.max_inflight:
+                return False
+            if self._total >= self.capacity - rc.headroom:
+                return False
+            self._inflight[name] += 1
+            self._total += 1
+            return True
+
+    def release(self, name: str):
+        with self._lock:
+            self._inflight[name] -= 1
+            self._total -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"total": self._total, "capacity": self.capacity, **self._inflight}
+
+bucket_store: BucketStore = (
+    RedisBucketStore(settings.ADMISSION_REDIS_URL) if settings.ADMISSION_REDIS_URL else InMemoryBucketStore()
+)
+limiter = ConcurrencyLimiter(settings.ADMISSION_MAX_INFLIGHT, ROUTE_CLASSES)
+
+@lru_cache(maxsize=1)
+def _trusted_proxies(spec: str) -> tuple:
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+def _is_trusted(host: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(addr in net for net in _trusted_proxies(settings.ADMISSION_TRUSTED_PROXIES))
+
+def _client_ip(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    if not _is_trusted(host):
+        return host  # X-Forwarded-For from anyone else is client-controlled
+    # Each proxy appends the address it was connected from: walk back past our own
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else host
+
+def admission(route_class: str):
+    """Dependency enforcing the rate limit and concurrency budget of `route_class`.
+
+    Use per route: dependencies=[Depends(admission("checkout"))].
+    """
+    rc = ROUTE_CLASSES[route_class]
+
+    async def _admit(request: Request):
+        ip = _client_ip(request)
+        token = await request_user_token(request)
+        if token is None:
+            wait = bucket_store.take(f"{route_class}:ip:{ip}", rc.rate, rc.burst)
+        else:
+            wait = bucket_store.take(f"{route_class}:user:{token}", rc.rate, rc.burst)
+            if wait == 0:
+                m = settings.ADMISSION_IP_MULTIPLIER
+                wait = bucket_store.take(f"{route_class}:ips:{ip}", rc.rate * m, rc.burst * m)
+        if wait > 0:
+            raise HTTPException(429, "Too many requests", headers={"Retry-After": str(ceil(wait))})
+        if not limiter.try_acquire(route_class):
+            raise HTTPException(503, "Server busy, please retry", headers={"Retry-After": "1"})
+        try:
+            yield
+        finally:
+            limiter.release(route_class)
+
+    return _admit
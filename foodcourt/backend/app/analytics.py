@@ -0,0 +1,168 @@
+# foodcourt/backend/app/analytics.py
+"""
+Time-bucketed sales analytics backed by hourly rollup tables.
+
+Orders are folded into vendor_sales_hourly / item_sales_hourly one window at a
+time: each refresh aggregates only [watermark, now - ROLLUP_SETTLE_SECONDS)
+and upserts the sums, so no refresh ever rescans old orders. A window spans at
+most ROLLUP_MAX_WINDOW_HOURS from the first unfolded order, which keeps each
+transaction short when the rollups are far behind (a fresh database starts at
+the epoch). Refreshes run in the background (app.maintenance), never in a
+request. Chart queries read the rollups (at most 24 rows per vendor per day)
+plus the live tail after the watermark, then regroup into hour / business-day
+/ week buckets.
+"""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db import settings
+
+ROLLUP_NAME = "sales_hourly"
+
+# Local hour of an order, stored as timestamptz
+_LOCAL_HOUR = "date_trunc('hour', o.created_at AT TIME ZONE :tz) AT TIME ZONE :tz"
+
+_VENDOR_UPSERT = text(f"""
+    INSERT INTO vendor_sales_hourly (vendor_id, bucket_start, orders, revenue_paise)
+    SELECT ol.vendor_id, {_LOCAL_HOUR}, count(DISTINCT o.id), sum(ol.price_paise * ol.qty + ol.tax_paise)
+    FROM orders o JOIN order_lines ol ON ol.order_id = o.id AND ol.created_at = o.created_at
+    WHERE o.created_at >= :lo AND o.created_at < :hi AND ol.created_at >= :lo AND ol.created_at < :hi
+    GROUP BY 1, 2
+    ON CONFLICT (vendor_id, bucket_start) DO UPDATE
+       SET orders = vendor_sales_hourly.orders + EXCLUDED.orders,
+           revenue_paise = vendor_sales_hourly.revenue_paise + EXCLUDED.revenue_paise
+""")
+
+_ITEM_UPSERT = text(f"""
+    INSERT INTO item_sales_hourly (vendor_id, menu_id, bucket_start, qty, revenue_paise)
+    SELECT ol.vendor_id, ol.menu_id, {_LOCAL_HOUR}, sum(ol.qty), sum(ol.price_paise * ol.qty + ol.tax_paise)
+    FROM orders o JOIN order_lines ol ON ol.order_id = o.id AND ol.created_at = o.created_at
+    WHERE o.created_at >= :lo AND o.created_at < :hi AND ol.created_at >= :lo AND ol.created_at < :hi
+    GROUP BY 1, 2, 3
+    ON CONFLICT (vendor_id, menu_id, bucket_start) DO UPDATE
+       SET qty = item_sales_hourly.qty + EXCLUDED.qty,
+           revenue_paise = item_sales_hourly.revenue_paise + EXCLUDED.revenue_paise
+""")
+
+# Bucket expressions over an hourly bucket_start; day/week follow the business day
+_BUCKET_EXPR = {
+    "hour": "bucket_start AT TIME ZONE :tz",
+    "day": "date_trunc('day', (bucket_start AT TIME ZONE :tz) - make_interval(hours => :day_start))",
+    "week": "date_trunc('week', (bucket_start AT TIME ZONE :tz) - make_interval(hours => :day_start))",
+}
+
+def refresh_rollups(db: Session) -> bool:
+    """Fold the next window of orders created since the last refresh into the hourly rollups.
+
+    Only one refresher runs at a time (row lock on rollup_state); concurrent
+    callers skip instead of waiting. Returns True if settled orders remain
+    beyond the window, i.e. the caller should run it again.
+    """
+    db.execute(
+        text("INSERT INTO rollup_state (name, watermark) VALUES (:name, 'epoch') ON CONFLICT DO NOTHING"),
+        {"name": ROLLUP_NAME},
+    )
+    lo = db.execute(
+        text("SELECT watermark FROM rollup_state WHERE name = :name FOR UPDATE SKIP LOCKED"),
+        {"name": ROLLUP_NAME},
+    ).scalar()
+    hi = datetime.now(timezone.utc) - timedelta(seconds=settings.ROLLUP_SETTLE_SECONDS)
+    if lo is None or lo >= hi:
+        db.commit()
+        return False
+
+    # The window starts at the first unfolded order, skipping any empty stretch before it
+    first = db.execute(
+        text("SELECT min(created_at) FROM orders WHERE created_at >= :lo"), {"lo": lo}
+    ).scalar()
+    behind = first is not None and first + timedelta(hours=settings.ROLLUP_MAX_WINDOW_HOURS) < hi
+    if behind:
+        hi = first + timedelta(hours=settings.ROLLUP_MAX_WINDOW_HOURS)
+    if first is not None and first < hi:
+        params = {"lo": lo, "hi": hi, "tz": settings.COURT_TIMEZONE}
+        db.execute(_VENDOR_UPSERT, params)
+        db.execute(_ITEM_UPSERT, params)
+    db.execute(
+        text("UPDATE rollup_state SET watermark = :hi WHERE name = :name"),
+        {"hi": hi, "name": ROLLUP_NAME},
+    )
+    db.commit()
+    return behind
+
+def business_day_start(now: datetime | None = None) -> datetime:
+    """Start of the current business day as an aware datetime in the court timezone."""
+    tz = ZoneInfo(settings.COURT_TIMEZONE)
+    local = (now or datetime.now(timezone.utc)).astimezone(tz)
+    start = local.replace(hour=settings.BUSINESS_DAY_START_HOUR, minute=0, second=0, microsecond=0)
+    if local < start:
+        start -= timedelta(days=1)
+    return start
+
+def sales_series(
+    db: Session,
+    vendor_id: int,
+    bucket: str,
+    start: datetime,
+    end: datetime,
+    by_item: bool = False,
+) -> list[dict]:
+    """Bucketed sales for a vendor in [start, end).
+
+    Reads the hourly rollups up to the watermark and the raw orders after it,
+    so results are current without waiting for the next refresh.
+    """
+    bucket_expr = _BUCKET_EXPR[bucket]
+    if by_item:
+        sql = f"""
+            WITH hourly AS (
+                SELECT menu_id, bucket_start, qty, revenue_paise FROM item_sales_hourly
+                WHERE vendor_id = :vid AND bucket_start >= :lo AND bucket_start < :hi
+                UNION ALL
+                SELECT ol.menu_id, {_LOCAL_HOUR}, sum(ol.qty), sum(ol.price_paise * ol.qty + ol.tax_paise)
+                FROM orders o JOIN order_lines ol ON ol.order_id = o.id AND ol.created_at = o.created_at
+                WHERE ol.vendor_id = :vid AND o.created_at >= :lo AND o.created_at < :hi
+                  AND ol.created_at >= :lo AND ol.created_at < :hi
+                  AND o.created_at >= (SELECT watermark FROM rollup_state WHERE name = :name)
+                GROUP BY 1, 2
+            )
+            SELECT {bucket_expr} AS bucket, h.menu_id, m.item_name, sum(h.qty), sum(h.revenue_paise)
+            FROM hourly h JOIN menus m ON m.id = h.menu_id
+            GROUP BY 1, 2, 3 ORDER BY 1, 5 DESC
+        """
+    else:
+        sql = f"""
+            WITH hourly AS (
+                SELECT bucket_start, orders, revenue_paise FROM vendor_sales_hourly
+                WHERE vendor_id = :vid AND bucket_start >= :lo AND bucket_start < :hi
+                UNION ALL
+                SELECT {_LOCAL_HOUR}, count(DISTINCT o.id), sum(ol.price_paise * ol.qty + ol.tax_paise)
+                FROM orders o JOIN order_lines ol ON ol.order_id = o.id AND ol.created_at = o.created_at
+                WHERE ol.vendor_id = :vid AND o.created_at >= :lo AND o.created_at < :hi
+                  AND ol.created_at >= :lo AND ol.created_at < :hi
+                  AND o.created_at >= (SELECT watermark FROM rollup_state WHERE name = :name)
+                GROUP BY 1
+            )
+            SELECT {bucket_expr} AS bucket, sum(orders), sum(revenue_paise)
+            FROM hourly GROUP BY 1 ORDER BY 1
+        """
+    # Rollup rows only ever hold orders before the watermark and the tail only
+    # orders after it, so the hour containing the watermark is summed from both.
+    rows = db.execute(text(sql), {
+        "vid": vendor_id,
+        "lo": start,
+        "hi": end,
+        "tz": settings.COURT_TIMEZONE,
+        "day_start": settings.BUSINESS_DAY_START_HOUR,
+        "name": ROLLUP_NAME,
+    }).all()
+
+    if by_item:
+        return [
+            {"bucket": b.isoformat(), "menu_id": menu_id, "item_name": name, "qty": int(qty), "revenue": int(rev) / 100}
+            for b, menu_id, name, qty, rev in rows
+        ]
+    return [
+        {"bucket": b.isoformat(), "orders": int(orders), "revenue": int(rev) / 100}
+        for b, orders, rev in rows
+    ]
@@ -0,0 +1,284 @@
+# foodcourt/backend/app/cart_store.py
+"""
+Write-through store of materialized carts for GET /cart.
+
+Cart writes (add / remove / batch) commit to Postgres, build the CartOut as
+before, and put its serialized JSON here under
+"<court>:<generation>:<user_token>" with the cart version. GET /cart answers from the store and only falls back to
+Postgres (and fills the store) on a miss. Checkout always reads the cart
+from Postgres, which stays the source of truth.
+
+put() never replaces an entry with an older cart version, so two workers
+finishing writes out of order cannot leave the stale one behind. Checkout
+and guest -> user cart migration bump the cart version and invalidate() the
+entry with a tombstone at that version: a GET that read the cart before the
+change and puts it afterwards is refused, as a plain delete would not.
+
+Cached carts carry menu names and prices, so editing a court's menu bumps
+the court's generation: every cart of the court moves to fresh keys and the
+old entries age out. Keys are built before the cart is read from Postgres,
+so a read that raced the edit lands on the old generation. Entries expire
+after CART_STORE_TTL_SECONDS, which also drops carts removed by the
+abandoned-cart purge long before it runs (CART_TTL_HOURS).
+
+The cart store is a cache: if it fails (redis down or slow), the error is
+logged and requests are served from Postgres.
+
+Set CART_STORE_REDIS_URL to share one store across workers; without it
+nothing is cached and GET /cart reads Postgres every time. The in-memory
+store (CART_STORE_LOCAL=1) is a per-process LRU bounded by
+CART_STORE_MAX_BYTES of serialized JSON. It is only consistent with a single
+worker: for tests and single-process development.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import logging
+import threading
+import time
+from app.db import settings
+
+log = logging.getLogger(__name__)
+
+TOMBSTONE = b""
+
+class CartStore(ABC):
+    """Serialized CartOut bodies by key. get() returns None on a miss or a tombstone."""
+    @abstractmethod
+    def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    def put(self, key: str, body: bytes, version: int): ...
+
+    @abstractmethod
+    def delete(self, *keys: str): ...
+
+    @abstractmethod
+    def stats(self) -> dict: ...
+
+    @abstractmethod
+    def generation(self, court_id: str) -> int: ...
+
+    @abstractmethod
+    def bump_generation(self, court_id: str): ...
+
+    def invalidate(self, key: str, version: int):
+        """Drop the cart at `key` and refuse puts of versions older than `version`."""
+        self.put(key, TOMBSTONE, version)
+
+class NullCartStore(CartStore):
+    """No cache: every get() misses and put() drops the body."""
+    def get(self, key: str) -> bytes | None:
+        return None
+
+    def put(self, key: str, body: bytes, version: int):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none"}
+
+    def generation(self, court_id: str) -> int:
+        return 0
+
+    def bump_generation(self, court_id: str):
+        pass
+
+class InMemoryCartStore(CartStore):
+    _ENTRY_OVERHEAD = 120  # rough bytes per entry for the key, tuple and dict slot
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[bytes, int, float]] = OrderedDict()  # key -> (body, version, expires_at)
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._generations: dict[str, int] = {}
+
+    def _size(self, key: str, body: bytes) -> int:
+        return len(key) + len(body) + self._ENTRY_OVERHEAD
+
+    def _drop(self, key: str):
+        body, _, _ = self._entries.pop(key)
+        self._bytes -= self._size(key, body)
+
+    def get(self, key: str) -> bytes | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            if entry[2] <= now:
+                self._drop(key)
+                self._counts["expired"] += 1
+                self._counts["misses"] += 1
+                return None
+            if entry[0] == TOMBSTONE:
+                self._counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return entry[0]
+
+    def put(self, key: str, body: bytes, version: int):
+        size = self._size(key, body)
+        if size > self._max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None:
+                if current[1] > version and current[2] > now:
+                    return
+                self._drop(key)
+            self._entries[key] = (body, version, now + self._ttl)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._counts["evictions"] += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._drop(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                **self._counts,
+            }
+
+    def generation(self, court_id: str) -> int:
+        return self._generations.get(court_id, 0)
+
+    def bump_generation(self, court_id: str):
+        with self._lock:
+            self._generations[court_id] = self._generations.get(court_id, 0) + 1
+
+class RedisCartStore(CartStore):
+    """Carts shared by all workers. Requires the optional `redis` package."""
+    _PUT = """
+    local current = tonumber(redis.call('HGET', KEYS[1], 'v') or '-1')
+    if current > tonumber(ARGV[2]) then return 0 end
+    redis.call('HSET', KEYS[1], 'b', ARGV[1], 'v', ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return 1
+    """
+
+    def __init__(self, url: str, ttl_seconds: float):
+        import redis
+        # Short timeouts: a slow store must not hold up requests Postgres can answer
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self._put = self._client.register_script(self._PUT)
+        self._ttl = max(1, int(ttl_seconds))
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0}  # this process only
+
+    def get(self, key: str) -> bytes | None:
+        body = self._client.hget(f"fc:cart:{key}", "b") or None  # b"" is a tombstone
+        with self._lock:
+            self._counts["hits" if body is not None else "misses"] += 1
+        return body
+
+    def put(self, key: str, body: bytes, version: int):
+        self._put(keys=[f"fc:cart:{key}"], args=[body, version, self._ttl])
+
+    def delete(self, *keys: str):
+        if keys:
+            self._client.delete(*(f"fc:cart:{k}" for k in keys))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "redis", **self._counts}
+
+    def generation(self, court_id: str) -> int:
+        return int(self._client.get(f"fc:cartgen:{court_id}") or 0)
+
+    def bump_generation(self, court_id: str):
+        self._client.incr(f"fc:cartgen:{court_id}")
+
+class FailOpenCartStore(CartStore):
+    """Wraps a remote store: errors are logged and read as misses, writes are skipped.
+
+    generation() returns None when the store is unreachable; cart_key() then
+    returns None and every operation on that key is a no-op, so nothing is
+    cached under a generation that may be out of date.
+    """
+    _WARN_EVERY = 60.0  # seconds between logged failures
+
+    def __init__(self, inner: CartStore):
+        self._inner = inner
+        self._last_warning = 0.0
+
+    def _failed(self, op: str):
+        now = time.monotonic()
+        if now - self._last_warning >= self._WARN_EVERY:
+            self._last_warning = now
+            log.warning("cart store %s failed, serving carts from Postgres", op, exc_info=True)
+
+    def get(self, key: str | None) -> bytes | None:
+        if key is None:
+            return None
+        try:
+            return self._inner.get(key)
+        except Exception:
+            self._failed("get")
+            return None
+
+    def put(self, key: str | None, body: bytes, version: int):
+        if key is None:
+            return
+        try:
+            self._inner.put(key, body, version)
+        except Exception:
+            self._failed("put")
+
+    def delete(self, *keys: str | None):
+        try:
+            self._inner.delete(*(k for k in keys if k is not None))
+        except Exception:
+            self._failed("delete")
+
+    def stats(self) -> dict:
+        try:
+            return self._inner.stats()
+        except Exception as exc:
+            return {"error": str(exc)}
+
+    def generation(self, court_id: str) -> int | None:
+        try:
+            return self._inner.generation(court_id)
+        except Exception:
+            self._failed("generation")
+            return None
+
+    def bump_generation(self, court_id: str):
+        # If this fails, cached carts keep the old menu until CART_STORE_TTL_SECONDS
+        try:
+            self._inner.bump_generation(court_id)
+        except Exception:
+            self._failed("bump_generation")
+
+def cart_key(court_id: str, user_token: str) -> str | None:
+    """Store key of a cart; build it before reading the cart. None: do not cache."""
+    generation = cart_store.generation(court_id)
+    if generation is None:
+        return None
+    return f"{court_id}:{generation}:{user_token}"
+
+cart_store: CartStore
+if settings.CART_STORE_REDIS_URL:
+    cart_store = FailOpenCartStore(RedisCartStore(settings.CART_STORE_REDIS_URL, settings.CART_STORE_TTL_SECONDS))
+elif settings.CART_STORE_LOCAL:
+    cart_store = InMemoryCartStore(settings.CART_STORE_MAX_BYTES, settings.CART_STORE_TTL_SECONDS)
+else:
+    cart_store = NullCartStore()
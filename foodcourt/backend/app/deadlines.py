@@ -0,0 +1,144 @@
+# foodcourt/backend/app/deadlines.py
+"""
+Per-route deadlines, enforced in Postgres.
+
+Every request session (get_db / get_read_db / get_user_read_db) gets a
+deadline: the route's budget from ROUTE_BUDGETS_MS, shortened by an
+incoming X-Request-Deadline-Ms header (the milliseconds the caller is still
+willing to wait; values <= 0 are ignored). The deadline rides on the
+connection for the length of each transaction. The first statement of the
+transaction sets statement_timeout and lock_timeout (SET LOCAL) to the time
+left; later statements reuse that setting, costing no round trip, until the
+time left drops more than TIMEOUT_SLACK_MS below it, and then set it again.
+So no statement outlives the deadline by more than the slack, however many
+queries a request runs. A slow query is cancelled by Postgres and hands its
+pooled connection back instead of starving checkout. A statement that would
+start after the deadline is refused outright.
+
+Either way the request ends in a 503 + Retry-After, and the timeout is
+counted per route and kind for /admin/deadlines:
+
+- statement: a query ran too long (wants an index or a rollup);
+- lock: waited too long on a row / table lock;
+- expired: the deadline had passed before the next statement.
+"""
+from collections import Counter, defaultdict
+import threading
+import time
+from fastapi import HTTPException, Request
+from fastapi.exception_handlers import http_exception_handler
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+DEFAULT_BUDGET_MS = 2000
+TIMEOUT_SLACK_MS = 50  # how far a statement may run past the deadline before timeouts are reset
+
+# By route path prefix; the first match wins, so keep specific paths first
+ROUTE_BUDGETS_MS = (
+    ("/checkout", 500),
+    ("/cart", 300),
+    ("/auth", 1000),  # includes argon2 hashing
+    ("/orders/history", 1000),
+    ("/orders", 500),
+    ("/payments", 1000),
+    ("/catalog", 1000),
+    ("/vendor/{vendor_id}/analytics", 5000),
+    ("/vendor/{vendor_id}/dashboard", 2000),
+    ("/vendor/{vendor_id}/stats", 2000),
+    ("/vendor", 1000),
+    ("/admin", 30000),
+)
+
+_PGCODES = {"57014": "statement", "55P03": "lock"}  # query_canceled, lock_not_available
+
+class DeadlineExceeded(Exception):
+    pass
+
+def route_label(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+def budget_ms(path: str) -> int:
+    for prefix, ms in ROUTE_BUDGETS_MS:
+        if path.startswith(prefix):
+            return ms
+    return DEFAULT_BUDGET_MS
+
+def start(db: Session, request: Request):
+    """Give a request session its deadline; enforced on every statement it runs."""
+    route = route_label(request)
+    ms = budget_ms(route)
+    try:
+        asked = int(request.headers.get(DEADLINE_HEADER, ms))
+    except ValueError:
+        asked = 0
+    if asked > 0:  # malformed, zero or negative: the route budget applies
+        ms = min(ms, asked)
+    db.info["deadline"] = time.monotonic() + ms / 1000
+    db.info["route"] = f"{request.method} {route}"
+
+@event.listens_for(Session, "after_begin")
+def _attach_deadline(session, transaction, connection):
+    connection.info.pop("timeout_ms", None)  # SET LOCAL ended with the previous transaction
+    if "deadline" in session.info:  # background jobs and admin tools run without one
+        connection.info["deadline"] = (session.info["deadline"], session.info["route"])
+
+@event.listens_for(Engine, "rollback_savepoint")
+def _savepoint_rolled_back(conn, name, context):
+    conn.info.pop("timeout_ms", None)  # a SET LOCAL inside the savepoint is undone with it
+
+@event.listens_for(Pool, "checkin")
+def _detach_deadline(dbapi_connection, connection_record):
+    connection_record.info.pop("deadline", None)  # the info dict outlives the checkout
+    connection_record.info.pop("timeout_ms", None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _set_timeouts(conn, cursor, statement, parameters, context, executemany):
+    attached = conn.info.get("deadline")
+    if attached is None:
+        return
+    deadline, route = attached
+    left = int((deadline - time.monotonic()) * 1000)
+    if left <= 0:
+        raise DeadlineExceeded(route)
+    current = conn.info.get("timeout_ms")
+    if current is not None and left >= current - TIMEOUT_SLACK_MS:
+        return
+    cursor.execute(f"SET LOCAL statement_timeout = {left}; SET LOCAL lock_timeout = {left}")
+    conn.info["timeout_ms"] = left
+
+# ---- Timeout accounting ----
+_lock = threading.Lock()
+timeouts: dict[str, Counter] = defaultdict(Counter)  # "METHOD /route" -> kind -> count
+
+def record(route: str, kind: str):
+    with _lock:
+        timeouts[route][kind] += 1
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "default_budget_ms": DEFAULT_BUDGET_MS,
+            "budgets_ms": dict(ROUTE_BUDGETS_MS),
+            "timeouts": {route: dict(kinds) for route, kinds in sorted(timeouts.items())},
+        }
+
+def _unavailable(request: Request):
+    return http_exception_handler(
+        request, HTTPException(503, "Request deadline exceeded", headers={"Retry-After": "1"})
+    )
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    record(f"{request.method} {route_label(request)}", "expired")
+    return await _unavailable(request)
+
+async def db_error_handler(request: Request, exc: DBAPIError):
+    kind = _PGCODES.get(getattr(exc.orig, "pgcode", None))
+    if kind is None:
+        raise exc  # not a timeout: a 500 as before
+    record(f"{request.method} {route_label(request)}", kind)
+    return await _unavailable(request)
@@ -0,0 +1,10 @@
+from fastapi import Header, HTTPException
+from secrets import compare_digest
+from app.db import settings
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    """Guard for /admin routes: X-Admin-Token must match ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(404, "Not found")
+    if not x_admin_token or not compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(403, "Admin token required")
@@ -0,0 +1,70 @@
+# foodcourt/backend/app/fastjson.py
+"""
+Fast response path for hot routes.
+
+With a response_model, FastAPI validates whatever the handler returns a
+second time, dumps it to JSON-mode Python and then runs json.dumps. Hot
+handlers already build validated schema objects, so they return a
+ModelResponse instead. Its body is written straight to bytes by the
+compiled pydantic-core serializer for the schema, and Decimals come out as
+"199.00" strings like before. Keep response_model on the route for the
+OpenAPI docs; FastAPI skips it when a Response is returned.
+
+(model_construct is not used: on pydantic v2 it is slower than validating.)
+
+FastJSONResponse is for plain dict/list payloads. It uses orjson when
+installed, with a Decimal hook, and falls back to the stdlib json module.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import List
+import json
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from app import schemas
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.__pydantic_serializer__.to_python(obj, mode="json")
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+@lru_cache(maxsize=None)
+def list_adapter(model_cls: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model_cls])
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+class ModelResponse(Response):
+    """Serialize an already-built schema object (or list of them) without re-validation."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if isinstance(content, list) and content and isinstance(content[0], BaseModel):
+            return list_adapter(type(content[0])).dump_json(content)
+        return dumps(content)
+
+# Build the list serializers for the shared schemas up front, not on first request
+for _cls in vars(schemas).values():
+    if isinstance(_cls, type) and issubclass(_cls, BaseModel) and _cls.__module__ == schemas.__name__:
+        list_adapter(_cls)
@@ -1,14 +1,21 @@
 # foodcourt/backend/app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import DBAPIError
 from app.routers.auth import router as auth_router
 from app.routers.catalog import router as catalog_router
 from app.routers.cart import router as cart_router
 from app.routers.checkout import router as checkout_router
 from app.routers.orders import router as orders_router
 from app.routers.vendor import router as vendor_router  # ADD THIS LINE
-from app.db import Base, engine, SessionLocal
+from app.routers.admin import router as admin_router
+from app.routers.payments import router as payments_router
+from app.db import SessionLocal, settings
 from app.seed import seed
+from app import deadlines, maintenance, outbox, profiler, tenancy
+from app.compression import CompressionMiddleware
+from app.pagination import NEXT_CURSOR_HEADER
+import asyncio
 
 app = FastAPI(title="FoodCourt Backend", version="0.1.0")
 
@@ -24,11 +31,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESS_MIN_BYTES)
+app.add_middleware(profiler.RequestCounterMiddleware)
+app.add_exception_handler(deadlines.DeadlineExceeded, deadlines.deadline_exceeded_handler)
+app.add_exception_handler(DBAPIError, deadlines.db_error_handler)
 
 # Dev-only: create tables + seed sample data
-Base.metadata.create_all(bind=engine)
+tenancy.init_shards()
 with SessionLocal() as db:
+    db.info["court_id"] = settings.DEFAULT_COURT
     seed(db)
 
 # Include all routers
@@ -38,6 +51,15 @@ app.include_router(cart_router)
 app.include_router(checkout_router)
 app.include_router(orders_router)
 app.include_router(vendor_router)  # ADD THIS LINE
+app.include_router(admin_router)
+app.include_router(payments_router)
+
+@app.on_event("startup")
+async def start_maintenance():
+    app.state.maintenance_task = asyncio.create_task(maintenance.run_periodically())
+    app.state.rollup_task = asyncio.create_task(maintenance.run_rollups_periodically())
+    if settings.OUTBOX_WORKER == "inprocess":
+        app.state.outbox_task = asyncio.create_task(outbox.run_worker())
 
 @app.get("/health")
 def health():
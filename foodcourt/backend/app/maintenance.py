@@ -0,0 +1,187 @@
+# foodcourt/backend/app/maintenance.py
+"""
+Background maintenance jobs.
+
+purge_abandoned_carts deletes carts that were never checked out and have not
+changed for CART_TTL_HOURS, in the courts each shard serves (a court being
+moved is left alone, see app.shard_admin). Checked-out carts stay, since order history finds
+orders by cart_id, but items left in them past the TTL are deleted (checkout
+empties the cart; this reclaims items of carts converted before it did). It
+works in small batches, each its own short transaction, and skips rows
+another session has locked, so it never holds long locks on carts /
+cart_items during service.
+
+purge_outbox deletes outbox events that were handled more than
+OUTBOX_RETENTION_HOURS ago, the same way. Dead events are kept.
+
+maintain_order_partitions creates upcoming monthly order partitions and
+archives finished history (app.partitions) on every shard.
+
+refresh_all_rollups folds new orders into the analytics rollups
+(app.analytics) on every shard's primary, one bounded window per
+transaction. It runs every ROLLUP_REFRESH_INTERVAL_SECONDS in its own loop,
+so analytics requests never wait for it; they read the unfolded tail live.
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+from sqlalchemy import text
+from app.analytics import refresh_rollups
+from app.db import settings, shard_engines, shard_session
+from app.partitions import archive_orders, ensure_partitions
+from app.tenancy import served_courts
+
+log = logging.getLogger(__name__)
+
+_PURGE_BATCH = text("""
+    WITH doomed AS (
+        SELECT c.id,
+               NOT EXISTS (SELECT 1 FROM orders o WHERE o.cart_id = c.id)
+               AND NOT EXISTS (SELECT 1 FROM orders_archive a WHERE a.cart_id = c.id) AS abandoned
+        FROM carts c
+        WHERE c.updated_at < :cutoff AND c.court_id = ANY(:courts)
+          AND (EXISTS (SELECT 1 FROM cart_items i WHERE i.cart_id = c.id)
+               OR NOT EXISTS (SELECT 1 FROM orders o WHERE o.cart_id = c.id)
+                  AND NOT EXISTS (SELECT 1 FROM orders_archive a WHERE a.cart_id = c.id))
+        ORDER BY c.id
+        LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+    ), items AS (
+        DELETE FROM cart_items WHERE cart_id IN (SELECT id FROM doomed) RETURNING 1
+    ), gone AS (
+        DELETE FROM carts WHERE id IN (SELECT id FROM doomed WHERE abandoned) RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM doomed), (SELECT count(*) FROM gone), (SELECT count(*) FROM items)
+""")
+
+_OUTBOX_PURGE_BATCH = text("""
+    DELETE FROM outbox_events WHERE id IN (
+        SELECT id FROM outbox_events
+        WHERE status = 'done' AND processed_at < :cutoff
+        LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+    )
+""")
+
+# Results of the most recent runs, for /admin/maintenance
+last_cart_purge: dict = {}
+last_outbox_purge: dict = {}
+last_partition_run: dict = {}
+last_rollup_refresh: dict = {}
+
+def purge_abandoned_carts(max_batches: int = 1000) -> dict:
+    """Delete expired, unconverted carts, and the items of expired converted ones,
+    in batches of CART_PURGE_BATCH.
+
+    Runs on every shard in turn. Returns the number of carts and cart items reclaimed.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.CART_TTL_HOURS)
+    carts = items = batches = 0
+    started = datetime.now(timezone.utc)
+    for shard in shard_engines:
+        courts = served_courts(shard)
+        with shard_session(shard) as db:
+            for _ in range(max_batches):
+                n_picked, n_carts, n_items = db.execute(
+                    _PURGE_BATCH, {"cutoff": cutoff, "batch": settings.CART_PURGE_BATCH, "courts": courts}
+                ).one()
+                db.commit()
+                batches += 1
+                carts += n_carts
+                items += n_items
+                if n_picked < settings.CART_PURGE_BATCH:
+                    break
+
+    result = {
+        "carts_deleted": carts,
+        "cart_items_deleted": items,
+        "batches": batches,
+        "cutoff": cutoff.isoformat(),
+        "started_at": started.isoformat(),
+        "duration_ms": round((datetime.now(timezone.utc) - started).total_seconds() * 1000, 1),
+    }
+    last_cart_purge.clear()
+    last_cart_purge.update(result)
+    log.info("cart purge reclaimed %d carts, %d items in %d batches", carts, items, batches)
+    return result
+
+def purge_outbox(max_batches: int = 1000) -> dict:
+    """Delete done outbox events older than OUTBOX_RETENTION_HOURS, per shard, in batches."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+    deleted = batches = 0
+    started = datetime.now(timezone.utc)
+    for shard in shard_engines:
+        with shard_session(shard) as db:
+            for _ in range(max_batches):
+                n = db.execute(_OUTBOX_PURGE_BATCH, {"cutoff": cutoff, "batch": settings.CART_PURGE_BATCH}).rowcount
+                db.commit()
+                batches += 1
+                deleted += n
+                if n < settings.CART_PURGE_BATCH:
+                    break
+
+    result = {
+        "events_deleted": deleted,
+        "batches": batches,
+        "cutoff": cutoff.isoformat(),
+        "started_at": started.isoformat(),
+        "duration_ms": round((datetime.now(timezone.utc) - started).total_seconds() * 1000, 1),
+    }
+    last_outbox_purge.clear()
+    last_outbox_purge.update(result)
+    log.info("outbox purge deleted %d events in %d batches", deleted, batches)
+    return result
+
+def maintain_order_partitions() -> dict:
+    """Create the next months' order partitions and archive old finished orders, per shard."""
+    result = {}
+    for shard, eng in shard_engines.items():
+        with eng.begin() as conn:
+            created = ensure_partitions(conn)
+        result[shard] = {"partitions_created": created, "archived": archive_orders(eng, served_courts(shard))}
+    last_partition_run.clear()
+    last_partition_run.update(result, finished_at=datetime.now(timezone.utc).isoformat())
+    return result
+
+def refresh_all_rollups(max_windows: int = 1000) -> dict:
+    """Fold settled orders into the rollups on every shard until caught up (or max_windows)."""
+    result = {}
+    for shard in shard_engines:
+        started = datetime.now(timezone.utc)
+        windows = 1
+        with shard_session(shard) as db:
+            while refresh_rollups(db) and windows < max_windows:
+                windows += 1
+        result[shard] = {
+            "windows": windows,
+            "duration_ms": round((datetime.now(timezone.utc) - started).total_seconds() * 1000, 1),
+        }
+    last_rollup_refresh.clear()
+    last_rollup_refresh.update(result, finished_at=datetime.now(timezone.utc).isoformat())
+    return result
+
+async def run_rollups_periodically():
+    """Startup task: refresh the analytics rollups every ROLLUP_REFRESH_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await asyncio.to_thread(refresh_all_rollups)
+        except Exception:
+            log.exception("rollup refresh failed")
+        await asyncio.sleep(settings.ROLLUP_REFRESH_INTERVAL_SECONDS)
+
+async def run_periodically():
+    """Startup task: run the maintenance jobs every CART_PURGE_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await asyncio.to_thread(purge_abandoned_carts)
+        except Exception:
+            log.exception("cart purge failed")
+        try:
+            await asyncio.to_thread(purge_outbox)
+        except Exception:
+            log.exception("outbox purge failed")
+        try:
+            await asyncio.to_thread(maintain_order_partitions)
+        except Exception:
+            log.exception("order partition maintenance failed")
+        await asyncio.sleep(settings.CART_PURGE_INTERVAL_SECONDS)
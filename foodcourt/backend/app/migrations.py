@@ -0,0 +1,135 @@
+# foodcourt/backend/app/migrations.py
+"""
+Idempotent schema upgrades for databases created before a column or index existed.
+
+create_all() only creates missing tables, so changes to existing tables are
+listed here and run at startup right after it. Every step must be safe to
+re-run: plain SQL uses IF [NOT] EXISTS, callables check the catalog first.
+Both run in one transaction under the schema advisory lock: workers starting
+together would otherwise pass the same catalog checks and collide.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from app.db import Base, settings
+from app.models import Order, OrderLine
+from app.partitions import ensure_partitions, lock_schema
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM information_schema.columns WHERE table_name = :t AND column_name = :c"),
+        {"t": table, "c": column},
+    ).first() is not None
+
+def _rupees_to_paise(table: str, old: str, new: str, default: int | None = None):
+    """Replace a NUMERIC rupee column with a BIGINT paise column, converting the data."""
+    def step(conn: Connection):
+        if not _has_column(conn, table, old):
+            return
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {new} BIGINT"))
+        conn.execute(text(f"UPDATE {table} SET {new} = round({old} * 100) WHERE {new} IS NULL"))
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {new} SET NOT NULL"))
+        if default is not None:
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {new} SET DEFAULT {default}"))
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {old}"))
+    return step
+
+def _partition_orders(conn: Connection):
+    """Rebuild pre-partitioning orders / order_lines as monthly range-partitioned tables."""
+    partitioned = conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = 'orders'"
+    )).first()
+    if partitioned:
+        return
+    conn.execute(text("ALTER TABLE order_lines ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ"))
+    conn.execute(text("""
+        UPDATE order_lines ol SET created_at = coalesce(o.created_at, now())
+        FROM orders o WHERE o.id = ol.order_id AND ol.created_at IS NULL
+    """))
+    conn.execute(text("UPDATE orders SET created_at = now() WHERE created_at IS NULL"))
+    # Move the old tables, their indexes and sequences out of the way of the new names
+    for name in ("order_lines", "orders"):
+        old = f"{name}_unpartitioned"
+        conn.execute(text(f"ALTER TABLE {name} RENAME TO {old}"))
+        for index in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": old}).scalars():
+            conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:50]}_unpartitioned"'))
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {name}_id_seq RENAME TO {old}_id_seq"))
+    Order.__table__.create(conn, checkfirst=True)  # checkfirst also skips the existing enum type
+    OrderLine.__table__.create(conn, checkfirst=True)
+    since = conn.execute(text("SELECT min(created_at) FROM orders_unpartitioned")).scalar()
+    ensure_partitions(conn, since)
+    for name, table in (("orders", Order.__table__), ("order_lines", OrderLine.__table__)):
+        cols = ", ".join(c.name for c in table.columns)
+        conn.execute(text(f"INSERT INTO {name} ({cols}) SELECT {cols} FROM {name}_unpartitioned"))
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), (SELECT coalesce(max(id), 0) + 1 FROM {name}), false)"
+        ))
+    conn.execute(text("DROP TABLE order_lines_unpartitioned, orders_unpartitioned"))
+
+def _archive_tables(conn: Connection):
+    """Cold copies of orders / order_lines for app.partitions.archive_orders."""
+    space = f" TABLESPACE {settings.ORDER_ARCHIVE_TABLESPACE}" if settings.ORDER_ARCHIVE_TABLESPACE else ""
+    for name in ("orders", "order_lines"):
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name}_archive (LIKE {name} INCLUDING DEFAULTS){space}"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_archive_cart ON orders_archive (cart_id, created_at)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_archive_court ON orders_archive (court_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_archive_id ON orders_archive (id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_order_lines_archive_order ON order_lines_archive (order_id)"))
+
+MIGRATIONS = [
+    # rollup windows (app.analytics) scan orders by created_at
+    "CREATE INDEX IF NOT EXISTS ix_orders_created_at ON orders (created_at)",
+    # abandoned cart cleanup (app.maintenance)
+    "ALTER TABLE carts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_carts_updated_at ON carts (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_orders_cart_id ON orders (cart_id)",
+    # cart versions for /cart/batch
+    "ALTER TABLE carts ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0",
+    # integer paise money (app.money) and per-vendor / per-item GST rates
+    _rupees_to_paise("menus", "price", "price_paise"),
+    _rupees_to_paise("cart_items", "price_snapshot", "price_snapshot_paise"),
+    _rupees_to_paise("orders", "total_gross", "total_gross_paise", default=0),
+    _rupees_to_paise("orders", "total_tax", "total_tax_paise", default=0),
+    _rupees_to_paise("orders", "total_net", "total_net_paise", default=0),
+    _rupees_to_paise("order_lines", "price", "price_paise"),
+    _rupees_to_paise("order_lines", "tax", "tax_paise", default=0),
+    _rupees_to_paise("vendor_sales_hourly", "revenue", "revenue_paise", default=0),
+    _rupees_to_paise("item_sales_hourly", "revenue", "revenue_paise", default=0),
+    "ALTER TABLE vendors ADD COLUMN IF NOT EXISTS gst_rate_bp INTEGER NOT NULL DEFAULT 500",
+    "ALTER TABLE menus ADD COLUMN IF NOT EXISTS gst_rate_bp INTEGER",
+    # food court tenancy (app.tenancy): existing rows belong to the default court
+    *[
+        stmt
+        for table in ("vendors", "menus", "carts", "orders")
+        for stmt in (
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS court_id VARCHAR NOT NULL DEFAULT '{settings.DEFAULT_COURT}'",
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_court_id ON {table} (court_id)",
+        )
+    ],
+    "ALTER TABLE vendors DROP CONSTRAINT IF EXISTS vendors_name_key",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_vendors_court_name ON vendors (court_id, name)",
+    # catalog search (app.search): trigram + full-text indexes on menu items
+    "ALTER TABLE menus ADD COLUMN IF NOT EXISTS category VARCHAR NOT NULL DEFAULT 'General'",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_menus_item_name_trgm ON menus USING gin (item_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_menus_search_tsv ON menus USING gin ("
+    "to_tsvector('simple', item_name || ' ' || category))",
+    "CREATE INDEX IF NOT EXISTS ix_menus_court_category ON menus (court_id, category)",
+    # keyset pagination of menus by (item_name, id) (app.pagination)
+    "CREATE INDEX IF NOT EXISTS ix_menus_court_item_name ON menus (court_id, item_name, id)",
+    # outbox retention (app.maintenance)
+    "CREATE INDEX IF NOT EXISTS ix_outbox_done ON outbox_events (processed_at) WHERE status = 'done'",
+    # monthly partitions + archive for orders / order_lines (app.partitions); keep these last,
+    # the rebuild copies whatever columns the earlier steps produced
+    _partition_orders,
+    _archive_tables,
+]
+
+def run_migrations(engine: Engine):
+    with engine.begin() as conn:
+        lock_schema(conn)
+        Base.metadata.create_all(bind=conn)
+        for step in MIGRATIONS:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(text(step))
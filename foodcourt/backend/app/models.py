@@ -1,34 +1,60 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, Boolean, DateTime, Enum, func
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, ForeignKeyConstraint, Boolean, DateTime, Enum, func
+from sqlalchemy import JSON, Index, text
 from sqlalchemy.orm import relationship
-from app.db import Base
+from app.db import Base, settings
 import enum
 from sqlalchemy import UniqueConstraint
 from passlib.hash import bcrypt
-
-class Vendor(Base):
+from app.money import rupees, DEFAULT_GST_RATE_BP
+
+class CourtScoped:
+    """Rows owned by one food court. Sessions opened for a request only see their
+    court's rows, and new rows are stamped with it (app.tenancy)."""
+    court_id = Column(String, nullable=False, index=True, server_default=settings.DEFAULT_COURT)
+
+class Court(Base):
+    """Directory entry (default shard): which shard holds a food court."""
+    __tablename__ = "courts"
+    id = Column(String, primary_key=True)  # slug, e.g. "main", "forum-mall"
+    name = Column(String, nullable=False)
+    shard = Column(String, nullable=False, default="default")
+    host = Column(String, unique=True)     # optional Host header that selects this court
+    status = Column(String, nullable=False, default="active")  # active | moving (writes refused)
+
+class Vendor(CourtScoped, Base):
     __tablename__ = "vendors"
+    __table_args__ = (UniqueConstraint("court_id", "name", name="uq_vendors_court_name"),)
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False, unique=True)
+    name = Column(String, nullable=False)
     stall_no = Column(String)
     gstin = Column(String)
+    gst_rate_bp = Column(Integer, nullable=False, default=DEFAULT_GST_RATE_BP, server_default=str(DEFAULT_GST_RATE_BP))  # 500 = 5%
 
     menus = relationship("Menu", back_populates="vendor")
 
-class Menu(Base):
+class Menu(CourtScoped, Base):
     __tablename__ = "menus"
     id = Column(Integer, primary_key=True)
     vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
     item_name = Column(String, nullable=False)
-    price = Column(Numeric(10,2), nullable=False)
+    category = Column(String, nullable=False, default="General", server_default="General")
+    price_paise = Column(BigInteger, nullable=False)
+    gst_rate_bp = Column(Integer, nullable=True)  # overrides the vendor rate when set
     is_active = Column(Boolean, default=True)
 
     vendor = relationship("Vendor", back_populates="menus")
 
-class Cart(Base):
+    @property
+    def price(self):  # Decimal rupees, for MenuOut
+        return rupees(self.price_paise)
+
+class Cart(CourtScoped, Base):
     __tablename__ = "carts"
     id = Column(Integer, primary_key=True)
     user_token = Column(String, index=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # last item change
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # optimistic concurrency for /cart/batch
 
     items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
 
@@ -39,7 +65,7 @@ class CartItem(Base):
     vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
     menu_id = Column(Integer, ForeignKey("menus.id"), nullable=False)
     qty = Column(Integer, nullable=False, default=1)
-    price_snapshot = Column(Numeric(10,2), nullable=False)
+    price_snapshot_paise = Column(BigInteger, nullable=False)
 
     cart = relationship("Cart", back_populates="items")
     vendor = relationship("Vendor")
@@ -53,35 +79,86 @@ class OrderStatus(str, enum.Enum):
     completed = "completed"
     cancelled = "cancelled"
 
-class Order(Base):
+# orders / order_lines are range-partitioned by month on created_at (app.partitions).
+# Postgres wants the partition key in the primary key, so the table key is
+# (id, created_at) while the ORM keeps identifying rows by id alone.
+class Order(CourtScoped, Base):
     __tablename__ = "orders"
-    id = Column(Integer, primary_key=True)
-    cart_id = Column(Integer, ForeignKey("carts.id"), nullable=False)
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cart_id = Column(Integer, ForeignKey("carts.id"), index=True, nullable=False)
     status = Column(Enum(OrderStatus), default=OrderStatus.created, nullable=False)
-    total_gross = Column(Numeric(10,2), nullable=False, default=0)
-    total_tax = Column(Numeric(10,2), nullable=False, default=0)
-    total_net = Column(Numeric(10,2), nullable=False, default=0)
+    total_gross_paise = Column(BigInteger, nullable=False, default=0)
+    total_tax_paise = Column(BigInteger, nullable=False, default=0)
+    total_net_paise = Column(BigInteger, nullable=False, default=0)
     payment_id = Column(String)  # placeholder for future gateway
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
     table_no = Column(String)  # e.g., "T-5", "T-12"
 
     lines = relationship("OrderLine", back_populates="order", cascade="all, delete-orphan")
+    __mapper_args__ = {"primary_key": [id]}
 
 class OrderLine(Base):
     __tablename__ = "order_lines"
-    id = Column(Integer, primary_key=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), index=True, nullable=False)
+    __table_args__ = (
+        # A foreign key into a partitioned table must cover its whole key
+        ForeignKeyConstraint(["order_id", "created_at"], ["orders.id", "orders.created_at"]),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, index=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True)  # the order's created_at
     vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
     menu_id = Column(Integer, ForeignKey("menus.id"), nullable=False)
     qty = Column(Integer, nullable=False)
-    price = Column(Numeric(10,2), nullable=False)
-    tax = Column(Numeric(10,2), nullable=False, default=0)
+    price_paise = Column(BigInteger, nullable=False)
+    tax_paise = Column(BigInteger, nullable=False, default=0)
     prepared_at = Column(DateTime(timezone=True), nullable=True)
     ready_at = Column(DateTime(timezone=True), nullable=True)
 
     order = relationship("Order", back_populates="lines")
+    __mapper_args__ = {"primary_key": [id]}
     vendor = relationship("Vendor")
     menu = relationship("Menu")
+
+# ---- Analytics rollups (hourly grain, refreshed incrementally by app.analytics) ----
+class VendorSalesHourly(Base):
+    __tablename__ = "vendor_sales_hourly"
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # start of local hour (COURT_TIMEZONE)
+    orders = Column(Integer, nullable=False, default=0)
+    revenue_paise = Column(BigInteger, nullable=False, default=0)
+
+class ItemSalesHourly(Base):
+    __tablename__ = "item_sales_hourly"
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), primary_key=True)
+    menu_id = Column(Integer, ForeignKey("menus.id"), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    qty = Column(Integer, nullable=False, default=0)
+    revenue_paise = Column(BigInteger, nullable=False, default=0)
+
+class RollupState(Base):
+    __tablename__ = "rollup_state"
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)  # orders before this are rolled up
+# ---- Transactional outbox (drained by app.outbox) ----
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    id = Column(BigInteger, primary_key=True)
+    topic = Column(String, nullable=False)           # e.g. "order.created", "payment.webhook"
+    dedupe_key = Column(String, nullable=False, unique=True)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="pending", server_default="pending")  # pending | done | dead
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # retry backoff
+    processed_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_outbox_pending", "available_at", "id", postgresql_where=text("status = 'pending'")),
+        Index("ix_outbox_done", "processed_at", postgresql_where=text("status = 'done'")),
+    )
 # ... existing imports
 
 
@@ -0,0 +1,92 @@
+# foodcourt/backend/app/money.py
+"""
+Money as integer paise, and the one place tax is computed.
+
+Amounts are stored as BIGINT paise (₹199.00 -> 19900) and added / multiplied
+as plain ints. Decimal rupees only appear at the API boundary (schemas keep
+their Decimal fields, so JSON still reads "199.00").
+
+GST rates are integer basis points (500 = 5%). The effective rate of a line
+is the menu item's override, else its vendor's rate, else DEFAULT_GST_RATE_BP.
+
+Rounding rule: tax is computed per order line as line_net * rate / 10000,
+rounded half-up to the paisa. Order tax is the sum of the line taxes; it is
+never rounded again, so lines always add up to the order total.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, Optional
+
+DEFAULT_GST_RATE_BP = 500  # 5%
+CURRENCY = "INR"
+
+@dataclass(frozen=True, order=True)
+class Money:
+    paise: int = 0
+
+    @classmethod
+    def from_rupees(cls, value) -> "Money":
+        """Decimal/str/int rupees -> Money, rounding half-up to the paisa."""
+        rupees = Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        return cls(int(rupees * 100))
+
+    @property
+    def rupees(self) -> Decimal:
+        return Decimal(self.paise).scaleb(-2)
+
+    def __add__(self, other: "Money") -> "Money":
+        return Money(self.paise + other.paise)
+
+    def __sub__(self, other: "Money") -> "Money":
+        return Money(self.paise - other.paise)
+
+    def __mul__(self, qty: int) -> "Money":
+        return Money(self.paise * qty)
+
+    __rmul__ = __mul__
+
+    def __str__(self) -> str:
+        return str(self.rupees)
+
+def to_paise(value) -> int:
+    return Money.from_rupees(value).paise
+
+def rupees(paise: Optional[int]) -> Decimal:
+    return Money(paise or 0).rupees
+
+def effective_rate_bp(item_rate_bp: Optional[int], vendor_rate_bp: Optional[int]) -> int:
+    if item_rate_bp is not None:
+        return item_rate_bp
+    if vendor_rate_bp is not None:
+        return vendor_rate_bp
+    return DEFAULT_GST_RATE_BP
+
+def line_tax(net_paise: int, rate_bp: int) -> int:
+    """Tax on one line, rounded half-up to the paisa (amounts are non-negative)."""
+    return (net_paise * rate_bp + 5000) // 10000
+
+@dataclass(frozen=True)
+class TaxedLine:
+    unit_paise: int
+    qty: int
+    rate_bp: int
+    net_paise: int
+    tax_paise: int
+
+@dataclass(frozen=True)
+class Totals:
+    net_paise: int
+    tax_paise: int
+    gross_paise: int
+
+def tax_lines(lines: Iterable[tuple[int, int, int]]) -> tuple[list[TaxedLine], Totals]:
+    """Apply the tax rule to (unit_paise, qty, rate_bp) lines."""
+    taxed = []
+    net = tax = 0
+    for unit, qty, rate in lines:
+        line_net = unit * qty
+        t = line_tax(line_net, rate)
+        taxed.append(TaxedLine(unit, qty, rate, line_net, t))
+        net += line_net
+        tax += t
+    return taxed, Totals(net_paise=net, tax_paise=tax, gross_paise=net + tax)
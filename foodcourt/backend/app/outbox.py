@@ -0,0 +1,192 @@
+# foodcourt/backend/app/outbox.py
+"""
+Transactional outbox.
+
+Request handlers call enqueue() inside the same transaction as the change
+they describe (checkout, status changes, an incoming payment webhook), so
+an event exists if and only if the change committed. The worker drains
+pending events in batches:
+
+- rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can run;
+- each event is handled in a savepoint and marked done in the same commit
+  as its DB side effects;
+- failures back off exponentially and go to status "dead" after
+  OUTBOX_MAX_ATTEMPTS; a handler raises PermanentError to dead-letter an
+  event at once when retrying cannot help;
+- dedupe_key is unique, so re-delivered webhooks or repeated enqueues are
+  dropped at insert time. Done events are deleted after
+  OUTBOX_RETENTION_HOURS (app.maintenance), which bounds that window; the
+  handlers are idempotent against the order's state beyond it.
+
+Run it in-process (OUTBOX_WORKER=inprocess, the default) or standalone:
+
+    python -m app.outbox
+
+Each shard has its own outbox table; the worker drains them in turn. Events
+for orders of a court the shard does not currently serve (one being moved,
+see app.shard_admin) are left pending; the move carries them to the court's
+new shard.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+import asyncio
+import logging
+import time
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.db import DEFAULT_SHARD, settings, shard_engines, shard_session
+from app.models import OutboxEvent, Order, OrderStatus
+from app.money import CURRENCY, to_paise
+from app.partitions import orders_archive
+from app.tenancy import served_courts
+
+log = logging.getLogger(__name__)
+
+class PermanentError(Exception):
+    """Handler failure that retrying cannot fix: the event goes straight to "dead"."""
+
+def enqueue(db: Session, topic: str, dedupe_key: str, payload: dict) -> bool:
+    """Add an event to the current transaction. Returns False if the key was already queued."""
+    result = db.execute(
+        pg_insert(OutboxEvent)
+        .values(topic=topic, dedupe_key=dedupe_key, payload=payload)
+        .on_conflict_do_nothing(index_elements=["dedupe_key"])
+    )
+    return result.rowcount == 1
+
+def order_status_event(db: Session, order: Order, source: str, source_key: str):
+    """Announce the order's new status. `source_key` identifies the change that caused
+    it (a webhook's dedupe key, a request id): redelivery of that change is dropped,
+    while a later transition back to the same status is a new event."""
+    status = order.status.value if isinstance(order.status, OrderStatus) else str(order.status)
+    enqueue(db, "order.status_changed", f"order.status:{order.id}:{status}:{source_key}", {
+        "order_id": order.id,
+        "status": status,
+        "source": source,
+    })
+
+# ---- Handlers ----
+# Subscribers for order events (vendor screens, receipts, ...). Each gets the
+# event's dedupe_key so it can make its own delivery idempotent.
+order_subscribers: list[Callable[[str, str, dict], None]] = []
+
+def _notify(db: Session, event: OutboxEvent):
+    for subscriber in order_subscribers:
+        subscriber(event.topic, event.dedupe_key, event.payload)
+
+def _apply_payment(db: Session, event: OutboxEvent):
+    p = event.payload
+    order = db.query(Order).filter(Order.id == p["order_id"]).with_for_update().first()
+    if order is None:
+        if db.execute(select(orders_archive.c.id).where(orders_archive.c.id == p["order_id"])).first():
+            return  # archived: long finished, nothing to pay
+        raise LookupError(f"order {p['order_id']} not found")
+    if p.get("status") != "captured" or order.status != OrderStatus.created:
+        return  # failed payment, or already paid / moved on: nothing to do
+    amount, currency = p.get("amount"), str(p.get("currency", CURRENCY)).upper()
+    if amount is None or to_paise(amount) != order.total_gross_paise or currency != CURRENCY:
+        # Order stays "created"; the dead event is kept for reconciliation
+        raise PermanentError(
+            f"capture of {amount} {currency} does not match order {order.id} "
+            f"total {order.total_gross_paise} paise {CURRENCY}"
+        )
+    order.status = OrderStatus.paid
+    order.payment_id = p.get("payment_id") or order.payment_id
+    order_status_event(db, order, source="payment.webhook", source_key=event.dedupe_key)
+
+HANDLERS: dict[str, Callable[[Session, OutboxEvent], None]] = {
+    "payment.webhook": _apply_payment,
+    "order.created": _notify,
+    "order.status_changed": _notify,
+}
+
+# ---- Worker ----
+stats = {
+    "processed": 0,
+    "failed": 0,
+    "dead": 0,
+    "batches": 0,
+    "last_batch_size": 0,
+    "last_batch_ms": 0.0,
+    "events_per_sec": 0.0,
+}
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2 ** attempts, 300))
+
+# Skips events about an order of a court this shard does not serve
+_SERVED_COURTS_ONLY = text("""
+    NOT EXISTS (SELECT 1 FROM orders o
+            WHERE o.id = (outbox_events.payload ->> 'order_id')::int AND o.court_id <> ALL(:courts))
+""")
+
+def drain_once(batch_size: int | None = None, shard: str = DEFAULT_SHARD) -> int:
+    """Process one batch of due events on a shard. Returns how many were claimed."""
+    started = time.perf_counter()
+    courts = served_courts(shard)
+    with shard_session(shard) as db:
+        events = (
+            db.query(OutboxEvent)
+              .filter(OutboxEvent.status == "pending", OutboxEvent.available_at <= func.now())
+              .filter(_SERVED_COURTS_ONLY.bindparams(courts=courts))
+              .order_by(OutboxEvent.id)
+              .limit(batch_size or settings.OUTBOX_BATCH)
+              .with_for_update(skip_locked=True)
+              .all()
+        )
+        now = datetime.now(timezone.utc)
+        for event in events:
+            handler = HANDLERS.get(event.topic)
+            try:
+                with db.begin_nested():
+                    if handler is None:
+                        raise KeyError(f"no handler for topic {event.topic!r}")
+                    handler(db, event)
+                event.status = "done"
+                event.processed_at = now
+                stats["processed"] += 1
+            except Exception as exc:
+                event.attempts += 1
+                event.last_error = f"{type(exc).__name__}: {exc}"[:500]
+                if isinstance(exc, PermanentError) or event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    event.status = "dead"
+                    event.processed_at = now
+                    stats["dead"] += 1
+                    log.error("outbox event %s dead after %d attempts: %s", event.id, event.attempts, exc)
+                else:
+                    event.available_at = now + _backoff(event.attempts)
+                    stats["failed"] += 1
+        db.commit()
+
+    elapsed = time.perf_counter() - started
+    if events:
+        stats["batches"] += 1
+        stats["last_batch_size"] = len(events)
+        stats["last_batch_ms"] = round(elapsed * 1000, 1)
+        stats["events_per_sec"] = round(len(events) / elapsed, 1) if elapsed else 0.0
+    return len(events)
+
+def lag(db: Session) -> dict:
+    """Backlog size and age of the oldest pending event."""
+    pending, oldest = db.query(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)).filter(
+        OutboxEvent.status == "pending"
+    ).one()
+    age = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0.0
+    return {"pending": pending, "oldest_pending_age_seconds": round(age, 3)}
+
+async def run_worker():
+    """Drain continuously; sleep OUTBOX_POLL_SECONDS when there is nothing to do."""
+    while True:
+        claimed = 0
+        for shard in shard_engines:
+            try:
+                claimed += await asyncio.to_thread(drain_once, None, shard)
+            except Exception:
+                log.exception("outbox drain failed on shard %s", shard)
+        if not claimed:
+            await asyncio.sleep(settings.OUTBOX_POLL_SECONDS)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
@@ -0,0 +1,61 @@
+# foodcourt/backend/app/pagination.py
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is requested with ?limit=N&cursor=C. Lists keep their JSON shape; the
+cursor for the next page comes back in the X-Next-Cursor header (absent on the
+last page), and envelope responses also carry it as next_cursor. Cursors are
+opaque: urlsafe base64 of the sort key of the last row returned, so the next
+page is "rows after that key" on an index instead of an ever-growing OFFSET.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, Callable, Sequence
+import json
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query as OrmQuery
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def limit_param(default: int = DEFAULT_LIMIT):
+    return Query(default, ge=1, le=MAX_LIMIT)
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    tagged = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return urlsafe_b64encode(json.dumps(tagged, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        raw = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in raw]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(400, "Invalid cursor")
+    if len(values) != size:
+        raise HTTPException(400, "Invalid cursor")
+    return values
+
+def keyset_page(
+    query: OrmQuery,
+    keys: Sequence,
+    key_of: Callable[[Any], Sequence[Any]],
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+) -> tuple[list, str | None]:
+    """Rows after `cursor` ordered by `keys` (the last key must be unique), and the next cursor."""
+    if cursor:
+        row, last = tuple_(*keys), tuple_(*decode_cursor(cursor, len(keys)))
+        query = query.filter(row < last if descending else row > last)
+    order = [k.desc() for k in keys] if descending else list(keys)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key_of(rows[-1]))
+
+def set_next_cursor(response: Response, next_cursor: str | None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,157 @@
+# foodcourt/backend/app/partitions.py
+"""
+Monthly partitions for orders / order_lines, and archival of old history.
+
+Both tables are range-partitioned on created_at (UTC months, named
+orders_p2026_10 / order_lines_p2026_10). ensure_partitions creates the
+months from the oldest order up to ORDER_PARTITION_MONTHS_AHEAD ahead; it
+runs at startup and with the periodic maintenance jobs. A DEFAULT partition
+catches anything outside that window so an insert never fails.
+
+archive_orders moves completed / cancelled orders from partitions older than
+ORDER_ARCHIVE_AFTER_MONTHS into orders_archive / order_lines_archive (plain
+tables, optionally in ORDER_ARCHIVE_TABLESPACE), one month per transaction,
+and drops a month's partitions once they are empty. Orders still in flight
+stay where they are. Months are only archived once the analytics rollups
+have folded them, so charts never need the archive; the archive horizon
+(everything archived is older than it) lets order history skip the archive
+unless it pages back that far.
+"""
+from datetime import datetime, timezone
+import logging
+from sqlalchemy import column, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from app.analytics import ROLLUP_NAME
+from app.db import settings
+from app.models import Order, OrderLine
+
+log = logging.getLogger(__name__)
+
+PARTITIONED = ("orders", "order_lines")
+ARCHIVE_STATE = "orders_archive"  # rollup_state row holding the archive horizon
+FINAL_STATUSES = ("completed", "cancelled")
+
+# Read-side handles on the archive tables (created by app.migrations, not create_all)
+orders_archive = table(
+    "orders_archive",
+    *[column(c.name, c.type) for c in Order.__table__.columns],
+)
+order_lines_archive = table(
+    "order_lines_archive",
+    *[column(c.name, c.type) for c in OrderLine.__table__.columns],
+)
+
+# Advisory lock taken by every schema change (app.migrations, new partitions), so
+# worker processes starting or maintaining at the same time take turns
+SCHEMA_LOCK_KEY = 0x46430001
+
+def lock_schema(conn: Connection):
+    """Hold the schema lock until the end of conn's transaction."""
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+def _month(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+def _add_months(month: datetime, n: int) -> datetime:
+    y, m = divmod(month.month - 1 + n, 12)
+    return datetime(month.year + y, m + 1, 1, tzinfo=timezone.utc)
+
+def partition_name(parent: str, month: datetime) -> str:
+    return f"{parent}_p{month:%Y_%m}"
+
+def _month_of(partition: str) -> datetime:
+    return datetime.strptime(partition.rsplit("_p", 1)[1], "%Y_%m").replace(tzinfo=timezone.utc)
+
+def _partitions(conn: Connection, parent: str) -> list[str]:
+    """Monthly partitions of parent, oldest first (the default partition excluded)."""
+    names = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :parent AND c.relname LIKE :pattern
+    """), {"parent": parent, "pattern": f"{parent}\\_p%"}).scalars().all()
+    return sorted(names)
+
+def ensure_partitions(conn: Connection, since: datetime | None = None) -> list[str]:
+    """Create missing monthly partitions from `since` (default: this month) up to the lookahead."""
+    lock_schema(conn)
+    now = datetime.now(timezone.utc)
+    month = _month(min(since or now, now))
+    last = _add_months(_month(now), settings.ORDER_PARTITION_MONTHS_AHEAD)
+    created = []
+    for parent in PARTITIONED:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {parent}_default PARTITION OF {parent} DEFAULT"))
+        existing = set(_partitions(conn, parent))
+        m = month
+        while m <= last:
+            name = partition_name(parent, m)
+            if name not in existing:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+                    f"FOR VALUES FROM ('{m.isoformat()}') TO ('{_add_months(m, 1).isoformat()}')"
+                ))
+                created.append(name)
+            m = _add_months(m, 1)
+    if created:
+        log.info("created partitions %s", ", ".join(created))
+    return created
+
+def archive_horizon(db: Session) -> datetime | None:
+    """Every archived order is older than this; None if nothing was archived."""
+    return db.execute(
+        text("SELECT watermark FROM rollup_state WHERE name = :name"), {"name": ARCHIVE_STATE}
+    ).scalar()
+
+def archive_orders(eng: Engine, courts: list[str]) -> dict:
+    """Archive finished orders of `courts` in months older than ORDER_ARCHIVE_AFTER_MONTHS.
+
+    Commits per month. Other courts' orders (one being moved off the shard) stay put,
+    and so does their month's partition until a later run archives them too.
+    """
+    cutoff = _add_months(_month(datetime.now(timezone.utc)), -settings.ORDER_ARCHIVE_AFTER_MONTHS)
+    with eng.connect() as conn:
+        rolled_up = conn.execute(
+            text("SELECT watermark FROM rollup_state WHERE name = :name"), {"name": ROLLUP_NAME}
+        ).scalar()
+        partitions = _partitions(conn, "orders")
+    if rolled_up is None:
+        return {"months": [], "orders": 0, "order_lines": 0}
+    cutoff = min(cutoff, _month(rolled_up))
+
+    order_cols = ", ".join(c.name for c in Order.__table__.columns)
+    line_cols = ", ".join(c.name for c in OrderLine.__table__.columns)
+    months, n_orders, n_lines = [], 0, 0
+    for orders_part in partitions:
+        month = _month_of(orders_part)
+        if _add_months(month, 1) > cutoff:
+            break
+        lines_part = partition_name("order_lines", month)
+        with eng.begin() as conn:
+            params = {"final": list(FINAL_STATUSES), "courts": courts}
+            finished = "status::text = ANY(:final) AND court_id = ANY(:courts)"
+            done = f"SELECT id FROM {orders_part} WHERE {finished}"
+            n_lines += conn.execute(text(
+                f"INSERT INTO order_lines_archive ({line_cols}) "
+                f"SELECT {line_cols} FROM {lines_part} WHERE order_id IN ({done})"
+            ), params).rowcount
+            n_orders += conn.execute(text(
+                f"INSERT INTO orders_archive ({order_cols}) "
+                f"SELECT {order_cols} FROM {orders_part} WHERE {finished}"
+            ), params).rowcount
+            conn.execute(text(f"DELETE FROM {lines_part} WHERE order_id IN ({done})"), params)
+            conn.execute(text(f"DELETE FROM {orders_part} WHERE {finished}"), params)
+
+            if conn.execute(text(f"SELECT NOT EXISTS (SELECT 1 FROM {orders_part})")).scalar():
+                conn.execute(text(f"DROP TABLE IF EXISTS {lines_part}"))
+                conn.execute(text(f"ALTER TABLE orders DETACH PARTITION {orders_part}"))
+                conn.execute(text(f"DROP TABLE {orders_part}"))
+            conn.execute(text("""
+                INSERT INTO rollup_state (name, watermark) VALUES (:name, :hi)
+                ON CONFLICT (name) DO UPDATE SET watermark = GREATEST(rollup_state.watermark, EXCLUDED.watermark)
+            """), {"name": ARCHIVE_STATE, "hi": _add_months(month, 1)})
+        months.append(f"{month:%Y-%m}")
+
+    if months:
+        log.info("archived %d orders / %d lines from %s", n_orders, n_lines, ", ".join(months))
+    return {"months": months, "orders": n_orders, "order_lines": n_lines}
@@ -0,0 +1,232 @@
+# foodcourt/backend/app/profiler.py
+"""
+On-demand sampling profiler for /admin/profile.
+
+A session runs a background thread that snapshots every thread's Python
+stack (sys._current_frames) every interval_ms, for a number of seconds or
+until N requests matching a route prefix have finished. Only stacks that
+are inside app code are kept, and each is attributed to its endpoint and
+classified by the innermost library frame:
+
+- db_wait: SQLAlchemy / psycopg2 (query execution, pool, ORM loading);
+- serialization: pydantic, app.fastjson, json encoders;
+- cpu: everything else (handlers, argon2 hashing, tax maths, ...).
+
+Results are aggregated as folded stacks ("a;b;c 12"), the input format of
+flamegraph.pl and speedscope. With allocations on, tracemalloc runs for the
+session and the top allocation sites are reported.
+
+When no session runs nothing is hooked: no sampler thread, no tracemalloc,
+and the request counter middleware returns after one attribute check.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+MAX_SECONDS = 120
+MAX_STACK_DEPTH = 64
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_SELF = os.path.abspath(__file__)
+
+# Innermost matching frame decides the category
+_CATEGORIES = (
+    ("db_wait", ("/sqlalchemy/", "/psycopg2/")),
+    ("serialization", ("/pydantic/", "/pydantic_core/", "/fastapi/encoders.py", "/json/", os.path.join(_APP_DIR, "fastjson.py"))),
+)
+
+def _category(filenames: list[str]) -> str:
+    for filename in filenames:  # leaf first
+        for name, markers in _CATEGORIES:
+            if any(m in filename for m in markers):
+                return name
+    return "cpu"
+
+def _label(code) -> str:
+    parts = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+class ProfileSession:
+    def __init__(
+        self,
+        seconds: float | None,
+        requests: int | None,
+        route: str | None,
+        endpoints: dict | None,
+        interval_ms: float,
+        allocations: bool,
+    ):
+        self.seconds = min(seconds or MAX_SECONDS, MAX_SECONDS)
+        self.requests = requests
+        self.route = route
+        self.endpoints = endpoints  # code object -> route label, for attribution / filtering
+        self.interval = interval_ms / 1000
+        self.allocations = allocations
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: datetime | None = None
+        self.requests_seen = 0
+        self.samples = 0
+        self.folded = {"cpu": Counter(), "db_wait": Counter(), "serialization": Counter()}
+        self.by_route: dict[str, Counter] = defaultdict(Counter)
+        self.top_allocations: list[dict] = []
+        self._lock = threading.Lock()  # sampler thread writes the counters, admin requests read them
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def start(self):
+        if self.allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(16)
+            self._started_tracemalloc = True
+        else:
+            self._started_tracemalloc = False
+        self._baseline = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def request_done(self, path: str):
+        if self.route is None or path.startswith(self.route):
+            self.requests_seen += 1
+            if self.requests and self.requests_seen >= self.requests:
+                self._stop.set()
+
+    def _run(self):
+        deadline = time.monotonic() + self.seconds
+        me = threading.get_ident()
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident != me:
+                        self._sample(frame)
+                self._stop.wait(self.interval)
+        finally:
+            self._finish()
+
+    def _sample(self, frame):
+        codes = []
+        while frame is not None and len(codes) < MAX_STACK_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        filenames = [c.co_filename for c in codes]
+        if not any(f.startswith(_APP_DIR) and f != _SELF for f in filenames):
+            return  # idle worker, event loop, or not request work
+        route = "other"
+        for code in codes:
+            if self.endpoints is not None and code in self.endpoints:
+                route = self.endpoints[code]
+                break
+        if self.route is not None and route == "other":
+            return
+        category = _category(filenames)
+        stack = ";".join(_label(c) for c in reversed(codes))
+        with self._lock:
+            self.samples += 1
+            self.folded[category][stack] += 1
+            self.by_route[route][category] += 1
+
+    def _snapshot(self) -> tuple[int, dict[str, Counter], dict[str, Counter]]:
+        with self._lock:
+            return (
+                self.samples,
+                {name: counter.copy() for name, counter in self.folded.items()},
+                {route: counter.copy() for route, counter in self.by_route.items()},
+            )
+
+    def _finish(self):
+        if self._baseline is not None:
+            ignore = [tracemalloc.Filter(False, _SELF), tracemalloc.Filter(False, tracemalloc.__file__)]
+            stats = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(
+                self._baseline.filter_traces(ignore), "lineno"
+            )
+            self.top_allocations = [
+                {"site": str(s.traceback[0]), "size_diff_kb": round(s.size_diff / 1024, 1), "count_diff": s.count_diff}
+                for s in stats[:25]
+            ]
+            self._baseline = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.finished_at = datetime.now(timezone.utc)
+
+    def folded_text(self, category: str | None = None) -> str:
+        _, folded, _ = self._snapshot()
+        counters = [folded[category]] if category else folded.values()
+        lines = Counter()
+        for counter in counters:
+            lines.update(counter)
+        return "\n".join(f"{stack} {n}" for stack, n in lines.most_common()) + "\n"
+
+    def summary(self) -> dict:
+        interval_ms = self.interval * 1000
+        samples, folded, by_route = self._snapshot()
+        totals = {name: sum(c.values()) for name, c in folded.items()}
+        return {
+            "running": self.running,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "route": self.route,
+            "requests_seen": self.requests_seen,
+            "interval_ms": interval_ms,
+            "samples": samples,
+            # samples * interval approximates time spent, per category
+            "ms": {name: round(n * interval_ms, 1) for name, n in totals.items()},
+            "by_route": {
+                route: {name: round(counter[name] * interval_ms, 1) for name in folded}
+                for route, counter in sorted(by_route.items())
+            },
+            "top_stacks": {
+                name: [{"stack": s, "samples": n} for s, n in counter.most_common(10)]
+                for name, counter in folded.items()
+            },
+            "top_allocations": self.top_allocations,
+        }
+
+_lock = threading.Lock()
+current: ProfileSession | None = None  # running or most recent session
+
+def start(**kwargs) -> ProfileSession:
+    global current
+    with _lock:
+        if current is not None and current.running:
+            raise RuntimeError("a profiling session is already running")
+        current = ProfileSession(**kwargs)
+        current.start()
+    return current
+
+def endpoints_for(routes, prefix: str | None) -> dict:
+    """Map endpoint code objects to "METHOD /path" for routes under prefix."""
+    found = {}
+    for route in routes:
+        endpoint = getattr(route, "endpoint", None)
+        path = getattr(route, "path", "")
+        if endpoint is None or not hasattr(endpoint, "__code__"):
+            continue
+        if prefix is None or path.startswith(prefix):
+            methods = ",".join(sorted(getattr(route, "methods", None) or []))
+            found[endpoint.__code__] = f"{methods} {path}".strip()
+    return found
+
+class RequestCounterMiddleware:
+    """Counts finished requests for request-bounded sessions; a no-op otherwise."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = current
+        if session is None or not session.running or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_done(scope["path"])
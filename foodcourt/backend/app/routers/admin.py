@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, confloat, conint
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from app.db import get_db
+from app.deps import require_admin
+from app import deadlines, maintenance, outbox, profiler
+from app.cart_store import cart_store
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/maintenance")
+def maintenance_status():
+    return {
+        "cart_purge": maintenance.last_cart_purge or None,
+        "outbox_purge": maintenance.last_outbox_purge or None,
+        "order_partitions": maintenance.last_partition_run or None,
+        "rollups": maintenance.last_rollup_refresh or None,
+    }
+
+@router.post("/maintenance/carts/purge")
+def purge_carts():
+    return maintenance.purge_abandoned_carts()
+
+@router.post("/maintenance/outbox/purge")
+def purge_outbox():
+    return maintenance.purge_outbox()
+
+@router.post("/maintenance/orders/archive")
+def archive_orders():
+    return maintenance.maintain_order_partitions()
+
+@router.post("/maintenance/rollups/refresh")
+def refresh_rollups():
+    return maintenance.refresh_all_rollups()
+
+@router.get("/cart-store")
+def cart_store_status():
+    return cart_store.stats()
+
+@router.get("/deadlines")
+def deadline_status():
+    """Route budgets and requests cut off by them (this process)."""
+    return deadlines.snapshot()
+
+@router.get("/outbox")
+def outbox_status(db: Session = Depends(get_db)):
+    """Worker throughput (this process) and backlog lag (all workers)."""
+    return {"worker": outbox.stats, **outbox.lag(db)}
+
+class ProfileIn(BaseModel):
+    seconds: Optional[confloat(gt=0, le=profiler.MAX_SECONDS)] = 10
+    requests: Optional[conint(ge=1)] = None  # stop after this many matching requests
+    route: Optional[str] = None  # path prefix, e.g. "/cart"
+    interval_ms: confloat(ge=1, le=1000) = 5
+    allocations: bool = False  # tracemalloc; adds noticeable overhead while on
+
+@router.post("/profile", status_code=202)
+def start_profile(payload: ProfileIn, request: Request):
+    """Start sampling; fetch the result from GET /admin/profile."""
+    try:
+        session = profiler.start(
+            seconds=payload.seconds,
+            requests=payload.requests,
+            route=payload.route,
+            endpoints=profiler.endpoints_for(request.app.routes, payload.route),
+            interval_ms=payload.interval_ms,
+            allocations=payload.allocations,
+        )
+    except RuntimeError as exc:
+        raise HTTPException(409, str(exc))
+    return session.summary()
+
+@router.post("/profile/stop")
+def stop_profile():
+    if profiler.current is None:
+        raise HTTPException(404, "No profiling session")
+    profiler.current.stop()
+    return profiler.current.summary()
+
+@router.get("/profile")
+def get_profile(
+    format: Literal["json", "folded"] = "json",
+    category: Optional[Literal["cpu", "db_wait", "serialization"]] = None,
+):
+    """Latest session: JSON summary, or folded stacks for flamegraph.pl / speedscope."""
+    session = profiler.current
+    if session is None:
+        raise HTTPException(404, "No profiling session")
+    if format == "folded":
+        return PlainTextResponse(session.folded_text(category))
+    return session.summary()
@@ -1,23 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 from secrets import token_hex
-from app.db import get_db
+from app.db import get_db, get_directory_db, mark_user_write, settings
 from app.models import User, Cart
 from app.schemas import SignupIn, LoginIn, AuthOut
+from app.admission import admission
+from app.cart_store import cart_key, cart_store
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-def _issue_user_token(user_id: int) -> str:
-    return f"user-{user_id}-{token_hex(6)}"
+def _issue_user_token(user_id: int, court_id: str) -> str:
+    # Tokens for other courts carry the court, so later requests route without a header
+    token = f"user-{user_id}-{token_hex(6)}"
+    return token if court_id == settings.DEFAULT_COURT else f"{court_id}~{token}"
 
 def _migrate_cart(db: Session, old_token: str | None, new_token: str):
     if not old_token or old_token == new_token:
         return
-    for c in db.query(Cart).filter(Cart.user_token == old_token).all():
-        c.user_token = new_token
+    moved = db.execute(
+        update(Cart).where(Cart.user_token == old_token)
+        .values(user_token=new_token, version=Cart.version + 1, updated_at=func.now())
+        .returning(Cart.id)
+    ).all()
+    if not moved:
+        db.commit()
+        return
+    # Newer than anything cached under either token, so stale reads cannot re-put them
+    version = db.query(func.max(Cart.version)).filter(Cart.user_token == new_token).scalar()
+    db.commit()
+    for token in (old_token, new_token):
+        cart_store.invalidate(cart_key(db.info["court_id"], token), version)
+    mark_user_write(new_token)
 
-@router.post("/signup", response_model=AuthOut)
-def signup(payload: SignupIn, db: Session = Depends(get_db)):
+@router.post("/signup", response_model=AuthOut, dependencies=[Depends(admission("auth"))])
+def signup(
+    payload: SignupIn,
+    db: Session = Depends(get_directory_db),
+    court_db: Session = Depends(get_db),
+):
     email = payload.email.lower()
     existing = db.query(User).filter(User.email == email).first()
     if existing:
@@ -32,14 +53,17 @@ def signup(payload: SignupIn, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(user)
 
-    user_token = _issue_user_token(user.id)
-    _migrate_cart(db, payload.guest_token, user_token)
-    db.commit()
+    user_token = _issue_user_token(user.id, court_db.info["court_id"])
+    _migrate_cart(court_db, payload.guest_token, user_token)
 
     return AuthOut(user_token=user_token, user_id=user.id, email=user.email, display_name=user.display_name)
 
-@router.post("/login", response_model=AuthOut)
-def login(payload: LoginIn, db: Session = Depends(get_db)):
+@router.post("/login", response_model=AuthOut, dependencies=[Depends(admission("auth"))])
+def login(
+    payload: LoginIn,
+    db: Session = Depends(get_directory_db),
+    court_db: Session = Depends(get_db),
+):
     email = payload.email.lower()
     user = db.query(User).filter(User.email == email).first()
     if not user or not user.check_password(payload.password):
@@ -49,8 +73,7 @@ def login(payload: LoginIn, db: Session = Depends(get_db)):
     user.maybe_upgrade_hash(payload.password)
     db.commit()
 
-    user_token = _issue_user_token(user.id)
-    _migrate_cart(db, payload.guest_token, user_token)
-    db.commit()
+    user_token = _issue_user_token(user.id, court_db.info["court_id"])
+    _migrate_cart(court_db, payload.guest_token, user_token)
 
     return AuthOut(user_token=user_token, user_id=user.id, email=user.email, display_name=user.display_name)
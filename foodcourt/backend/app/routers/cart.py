@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, update
 from decimal import Decimal
+from app.money import Money
 from app.db import get_db
 from app.models import Cart, CartItem, Menu, Vendor
-from app.schemas import AddToCartIn, RemoveFromCartIn, CartOut, CartItemOut
+from app.schemas import AddToCartIn, RemoveFromCartIn, CartBatchIn, CartOut, CartItemOut
+from app.admission import admission
+from app.fastjson import ModelResponse
+from app.cart_store import cart_key, cart_store
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
@@ -16,12 +21,13 @@ def _get_or_create_cart(db, user_token: str) -> Cart:
         db.refresh(cart)
     return cart
 
-@router.post("/add", response_model=CartOut)
+@router.post("/add", response_model=CartOut, dependencies=[Depends(admission("cart"))])
 def add_to_cart(payload: AddToCartIn, db: Session = Depends(get_db)):
     menu = db.query(Menu).filter(Menu.id == payload.menu_id, Menu.is_active == True).first()
     if not menu:
         raise HTTPException(404, "Menu item not found")
 
+    key = cart_key(db.info["court_id"], payload.user_token)
     cart = _get_or_create_cart(db, payload.user_token)
 
     # merge if same menu
@@ -30,6 +36,8 @@ def add_to_cart(payload: AddToCartIn, db: Session = Depends(get_db)):
           .filter(CartItem.cart_id == cart.id, CartItem.menu_id == menu.id)
           .first()
     )
+    cart.updated_at = func.now()
+    cart.version = Cart.version + 1
     if existing:
         existing.qty += payload.qty
     else:
@@ -38,15 +46,16 @@ def add_to_cart(payload: AddToCartIn, db: Session = Depends(get_db)):
             vendor_id=menu.vendor_id,
             menu_id=menu.id,
             qty=payload.qty,
-            price_snapshot=menu.price
+            price_snapshot_paise=menu.price_paise
         )
         db.add(ci)
 
     db.commit()
-    return _cart_out(db, cart.id, payload.user_token)
+    return _stored(key, _cart_out(db, cart.id, payload.user_token, cart.version))
 
-@router.post("/remove", response_model=CartOut)
+@router.post("/remove", response_model=CartOut, dependencies=[Depends(admission("cart"))])
 def remove_from_cart(payload: RemoveFromCartIn, db: Session = Depends(get_db)):
+    key = cart_key(db.info["court_id"], payload.user_token)
     cart = db.query(Cart).filter(Cart.user_token == payload.user_token).first()
     if not cart:
         raise HTTPException(404, "Cart not found")
@@ -56,15 +65,101 @@ def remove_from_cart(payload: RemoveFromCartIn, db: Session = Depends(get_db)):
         raise HTTPException(404, "Cart item not found")
 
     db.delete(item)
+    cart.updated_at = func.now()
+    cart.version = Cart.version + 1
     db.commit()
-    return _cart_out(db, cart.id, payload.user_token)
+    return _stored(key, _cart_out(db, cart.id, payload.user_token, cart.version))
+
+@router.post("/batch", response_model=CartOut, dependencies=[Depends(admission("cart"))])
+def batch_update_cart(payload: CartBatchIn, db: Session = Depends(get_db)):
+    """Apply an ordered list of add/remove/set_qty ops in one transaction.
+
+    payload.version must match the cart's current version, otherwise 409 so
+    the client can re-read the cart and replay its pending taps.
+    """
+    key = cart_key(db.info["court_id"], payload.user_token)
+    cart = db.query(Cart).filter(Cart.user_token == payload.user_token).first()
+    if not cart:
+        if payload.version != 0:
+            raise HTTPException(409, "Cart version is stale")
+        cart = Cart(user_token=payload.user_token)
+        db.add(cart)
+        db.flush()
+
+    # Compare-and-set the version first: concurrent batches serialize on this row
+    bumped = db.execute(
+        update(Cart)
+        .where(Cart.id == cart.id, Cart.version == payload.version)
+        .values(version=Cart.version + 1, updated_at=func.now())
+        .returning(Cart.version)
+    ).scalar()
+    if bumped is None:
+        db.rollback()
+        raise HTTPException(409, "Cart version is stale")
+
+    existing = {ci.menu_id: ci for ci in db.query(CartItem).filter(CartItem.cart_id == cart.id).all()}
+    by_item_id = {ci.id: ci.menu_id for ci in existing.values()}
+    qty = {menu_id: ci.qty for menu_id, ci in existing.items()}
+
+    for op in payload.ops:
+        menu_id = op.menu_id if op.menu_id is not None else by_item_id.get(op.cart_item_id)
+        if menu_id is None:
+            raise HTTPException(404, "Cart item not found")
+        if op.op == "add":
+            if op.menu_id is None:
+                raise HTTPException(400, "add needs menu_id")
+            qty[menu_id] = qty.get(menu_id, 0) + op.qty
+        elif op.op == "remove":
+            qty[menu_id] = 0
+        else:
+            qty[menu_id] = op.qty
+
+    new_ids = [m for m, q in qty.items() if q > 0 and m not in existing]
+    menus = {}
+    if new_ids:
+        menus = {
+            m.id: m for m in db.query(Menu).filter(Menu.id.in_(new_ids), Menu.is_active == True).all()
+        }
+        if len(menus) != len(new_ids):
+            raise HTTPException(404, "Menu item not found")
+
+    to_delete = [ci.id for m, ci in existing.items() if qty[m] <= 0]
+    to_update = [{"id": ci.id, "qty": qty[m]} for m, ci in existing.items() if qty[m] > 0 and qty[m] != ci.qty]
+    to_insert = [
+        {"cart_id": cart.id, "vendor_id": menus[m].vendor_id, "menu_id": m, "qty": qty[m],
+         "price_snapshot_paise": menus[m].price_paise}
+        for m in new_ids
+    ]
+    if to_delete:
+        db.query(CartItem).filter(CartItem.id.in_(to_delete)).delete(synchronize_session=False)
+    if to_update:
+        db.execute(update(CartItem), to_update)
+    if to_insert:
+        db.execute(insert(CartItem), to_insert)
+
+    db.commit()
+    return _stored(key, _cart_out(db, cart.id, payload.user_token, bumped))
 
 @router.get("", response_model=CartOut)
 def get_cart(user_token: str, db: Session = Depends(get_db)):
-    cart = _get_or_create_cart(db, user_token)
-    return _cart_out(db, cart.id, user_token)
+    key = cart_key(db.info["court_id"], user_token)
+    body = cart_store.get(key)
+    if body is not None:
+        return Response(body, media_type="application/json")
+    # Read-only: a token without a cart gets an empty virtual cart (cart_id=0).
+    # Not cached: its version 0 would shadow the real cart's first writes.
+    cart = db.query(Cart).filter(Cart.user_token == user_token).first()
+    if not cart:
+        return ModelResponse(CartOut(cart_id=0, user_token=user_token, items=[], subtotal=Decimal("0.00")))
+    return _stored(key, _cart_out(db, cart.id, user_token, cart.version))
+
+def _stored(key: str | None, out: CartOut) -> ModelResponse:
+    """Respond with `out` and write it through to the cart store under `key`."""
+    resp = ModelResponse(out)
+    cart_store.put(key, resp.body, out.version)
+    return resp
 
-def _cart_out(db: Session, cart_id: int, user_token: str) -> CartOut:
+def _cart_out(db: Session, cart_id: int, user_token: str, version: int = 0) -> CartOut:
     items = (
         db.query(CartItem, Menu, Vendor)
           .join(Menu, CartItem.menu_id == Menu.id)
@@ -73,9 +168,9 @@ def _cart_out(db: Session, cart_id: int, user_token: str) -> CartOut:
           .all()
     )
     out_items = []
-    subtotal = Decimal("0.00")
+    subtotal = Money()
     for ci, menu, vendor in items:
-        line_total = Decimal(ci.qty) * Decimal(ci.price_snapshot)
+        line_total = Money(ci.price_snapshot_paise) * ci.qty
         subtotal += line_total
         out_items.append(
             CartItemOut(
@@ -85,7 +180,7 @@ def _cart_out(db: Session, cart_id: int, user_token: str) -> CartOut:
                 item_name=menu.item_name,
                 qty=ci.qty,
                 price_each=menu.price,
-                line_total=line_total
+                line_total=line_total.rupees
             )
         )
-    return CartOut(cart_id=cart_id, user_token=user_token, items=out_items, subtotal=subtotal)
\ No newline at end of file
+    return CartOut(cart_id=cart_id, user_token=user_token, items=out_items, subtotal=subtotal.rupees, version=version)
\ No newline at end of file
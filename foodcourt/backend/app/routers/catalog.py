@@ -1,19 +1,76 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from decimal import Decimal
 from app.db import get_db
 from app.models import Vendor, Menu
-from app.schemas import VendorOut, MenuOut
+from app.money import to_paise
+from app.pagination import decode_cursor, encode_cursor, keyset_page, limit_param, set_next_cursor
+from app.schemas import VendorOut, MenuOut, MenuSearchOut, MenuSuggestionOut
+from app import search
 from typing import List, Optional
 
 router = APIRouter(prefix="/catalog", tags=["catalog"])
 
 @router.get("/vendors", response_model=List[VendorOut])
-def list_vendors(db: Session = Depends(get_db)):
-    return db.query(Vendor).order_by(Vendor.name).all()
+def list_vendors(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = limit_param(),
+    db: Session = Depends(get_db),
+):
+    vendors, next_cursor = keyset_page(
+        db.query(Vendor), [Vendor.name, Vendor.id], lambda v: (v.name, v.id), cursor, limit
+    )
+    set_next_cursor(response, next_cursor)
+    return vendors
 
 @router.get("/menus", response_model=List[MenuOut])
-def list_menus(vendor_id: Optional[int] = None, db: Session = Depends(get_db)):
+def list_menus(
+    response: Response,
+    vendor_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = limit_param(),
+    db: Session = Depends(get_db),
+):
     q = db.query(Menu).filter(Menu.is_active == True)
     if vendor_id:
         q = q.filter(Menu.vendor_id == vendor_id)
-    return q.order_by(Menu.item_name).all()
+    items, next_cursor = keyset_page(q, [Menu.item_name, Menu.id], lambda m: (m.item_name, m.id), cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return items
+
+@router.get("/search", response_model=MenuSearchOut)
+def search_menus(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=100),
+    category: Optional[str] = None,
+    vendor_id: Optional[int] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    limit: int = limit_param(20),
+    db: Session = Depends(get_db),
+):
+    """Search active items across all vendors, best match first"""
+    # Relevance order has no stable key to seek on, so this cursor carries an offset
+    offset = decode_cursor(cursor, 1)[0] if cursor else 0
+    if not isinstance(offset, int) or offset < 0:
+        raise HTTPException(400, "Invalid cursor")
+    items, total = search.search_menus(
+        db, q, category, vendor_id,
+        to_paise(min_price) if min_price is not None else None,
+        to_paise(max_price) if max_price is not None else None,
+        offset, limit,
+    )
+    next_cursor = encode_cursor([offset + len(items)]) if offset + len(items) < total else None
+    set_next_cursor(response, next_cursor)
+    return MenuSearchOut(items=[MenuOut.model_validate(m) for m in items], total=total, next_cursor=next_cursor)
+
+@router.get("/suggest", response_model=List[MenuSuggestionOut])
+def suggest_menus(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """Typeahead on item name / category prefixes, served from memory"""
+    return [MenuSuggestionOut(**vars(s)) for s in search.suggest(db, q, limit)]
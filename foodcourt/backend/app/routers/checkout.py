@@ -1,54 +1,88 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
-from decimal import Decimal
-from app.db import get_db
-from app.models import Cart, CartItem, Order, OrderLine, OrderStatus, Menu
+from app.db import get_db, mark_user_write
+from app.models import Cart, CartItem, Order, OrderLine, OrderStatus, Menu, Vendor
 from app.schemas import CheckoutIn, CheckoutOut
+from app.admission import admission
+from app.money import effective_rate_bp, tax_lines, rupees
+from app.outbox import enqueue
+from app.cart_store import cart_key, cart_store
 
-router = APIRouter(prefix="/checkout", tags=["checkout"])
-
-GST_RATE = Decimal("0.05")  # simple flat 5% placeholder for demo
+router = APIRouter(prefix="/checkout", tags=["checkout"], dependencies=[Depends(admission("checkout"))])
 
 @router.post("", response_model=CheckoutOut)
 def checkout(payload: CheckoutIn, db: Session = Depends(get_db)):
-    cart = db.query(Cart).filter(Cart.user_token == payload.user_token).first()
-    if not cart or len(cart.items) == 0:
+    # Locked: a double-submitted checkout waits here, then finds the cart emptied
+    cart = db.query(Cart).filter(Cart.user_token == payload.user_token).with_for_update().first()
+    if not cart:
+        raise HTTPException(400, "Cart is empty")
+
+    # lock price snapshot -> use ci.price_snapshot_paise; GST rate from item, else vendor
+    rows = (
+        db.query(CartItem, Menu.gst_rate_bp, Vendor.gst_rate_bp)
+          .join(Menu, CartItem.menu_id == Menu.id)
+          .join(Vendor, CartItem.vendor_id == Vendor.id)
+          .filter(CartItem.cart_id == cart.id)
+          .all()
+    )
+    if not rows:
         raise HTTPException(400, "Cart is empty")
 
-    # calculate totals & create order
-    subtotal = Decimal("0.00")
-    order = Order(cart_id=cart.id, status=OrderStatus.created)
+    taxed, totals = tax_lines(
+        (ci.price_snapshot_paise, ci.qty, effective_rate_bp(item_rate, vendor_rate))
+        for ci, item_rate, vendor_rate in rows
+    )
+
+    # create order
+    order = Order(
+        cart_id=cart.id,
+        status=OrderStatus.created,
+        total_gross_paise=totals.gross_paise,
+        total_tax_paise=totals.tax_paise,
+        total_net_paise=totals.gross_paise,  # no discounts/shipping in MVP
+    )
     db.add(order)
     db.flush()
 
-    for ci in cart.items:
-        # lock price snapshot -> use ci.price_snapshot
-        line_price = Decimal(ci.price_snapshot)
-        subtotal += line_price * ci.qty
-        ol = OrderLine(
+    db.add_all([
+        OrderLine(
             order_id=order.id,
+            created_at=order.created_at,  # partition key, same month as the order
             vendor_id=ci.vendor_id,
             menu_id=ci.menu_id,
-            qty=ci.qty,
-            price=line_price,
-            tax=(line_price * ci.qty * GST_RATE).quantize(Decimal("0.01"))
+            qty=line.qty,
+            price_paise=line.unit_paise,
+            tax_paise=line.tax_paise,
         )
-        db.add(ol)
+        for (ci, _, _), line in zip(rows, taxed)
+    ])
 
-    total_tax = (subtotal * GST_RATE).quantize(Decimal("0.01"))
-    total_gross = (subtotal + total_tax).quantize(Decimal("0.01"))
-    order.total_gross = total_gross
-    order.total_tax = total_tax
-    order.total_net = total_gross  # no discounts/shipping in MVP
+    # The lines now live on the order; the cart row stays (history finds orders by
+    # cart_id) and starts over empty for the next order
+    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete(synchronize_session=False)
+    cart_version = db.execute(
+        update(Cart).where(Cart.id == cart.id)
+        .values(version=Cart.version + 1, updated_at=func.now())
+        .returning(Cart.version)
+    ).scalar()
 
     # STUB “payment link”
     order.payment_id = f"STUB-{order.id}"
+    enqueue(db, "order.created", f"order.created:{order.id}", {
+        "order_id": order.id,
+        "user_token": payload.user_token,
+        "vendor_ids": sorted({ci.vendor_id for ci, _, _ in rows}),
+        "total_gross_paise": totals.gross_paise,
+    })
     db.commit()
+    cart_store.invalidate(cart_key(db.info["court_id"], payload.user_token), cart_version)
+    mark_user_write(payload.user_token)  # their history must show this order
 
     # In a real flow, we’d return a gateway link. For now, a fake URL:
     return CheckoutOut(
         order_id=order.id,
         status=order.status.value,
-        payable_amount=total_gross,
+        payable_amount=rupees(totals.gross_paise),
         payment_link=f"https://example.com/pay/{order.payment_id}"
     )
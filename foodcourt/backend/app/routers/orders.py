@@ -1,79 +1,122 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.db import get_db
+from app.db import get_db, get_user_read_db
+from app.deps import require_admin
 from app.models import Order
 from app.schemas import OrderStatusOut
-from typing import List
-from sqlalchemy import func
-from app.models import Order, OrderLine, Cart, Vendor, Menu
+from typing import List, Optional
+from uuid import uuid4
+from sqlalchemy import func, select, tuple_
+from app.models import Order, OrderLine, OrderStatus, Cart, Vendor, Menu
 from app.schemas import OrderHistoryOut, OrderHistoryItem, OrderLineBrief
+from app.fastjson import ModelResponse
+from app.money import rupees
+from app.outbox import order_status_event
+from app.pagination import decode_cursor, encode_cursor, limit_param, set_next_cursor
+from app.partitions import archive_horizon, orders_archive, order_lines_archive
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
-@router.get("/{order_id}", response_model=OrderStatusOut)
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(404, "Order not found")
-    return OrderStatusOut(order_id=order.id, status=order.status.value, total_gross=order.total_gross)
-
-# For demo/testing: mark paid (simulating a payment webhook)
-@router.post("/{order_id}/mark-paid", response_model=OrderStatusOut)
-def mark_paid(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(404, "Order not found")
-    order.status = "paid"
-    db.commit()
-    return OrderStatusOut(order_id=order.id, status=order.status.value, total_gross=order.total_gross)
-
-
+def _history_orders(db: Session, cart_ids, limit: int, cursor: str | None) -> tuple[list, str | None]:
+    """Orders for the carts after `cursor`, newest first, reading the archive only if it could hold some."""
+    after = decode_cursor(cursor, 2) if cursor else None
+    live = db.query(Order.id, Order.status, Order.total_gross_paise, Order.created_at, Order.payment_id) \
+        .filter(Order.cart_id.in_(cart_ids))
+    if after:
+        live = live.filter(tuple_(Order.created_at, Order.id) < tuple_(*after))
+    rows = [
+        (*row, False)
+        for row in live.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+    ]
+    horizon = archive_horizon(db)
+    if horizon is not None and (len(rows) <= limit or rows[limit][3] < horizon):
+        a = orders_archive
+        archived = select(a.c.id, a.c.status, a.c.total_gross_paise, a.c.created_at, a.c.payment_id) \
+            .where(a.c.cart_id.in_(cart_ids), a.c.court_id == db.info["court_id"])
+        if after:
+            archived = archived.where(tuple_(a.c.created_at, a.c.id) < tuple_(*after))
+        archived = db.execute(archived.order_by(a.c.created_at.desc(), a.c.id.desc()).limit(limit + 1)).all()
+        rows = sorted(rows + [(*row, True) for row in archived], key=lambda r: (r[3], r[0]), reverse=True)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([rows[-1][3], rows[-1][0]])
 
+# Declared before /{order_id} so "history" is not parsed as an order id
 @router.get("/history", response_model=OrderHistoryOut)
-def order_history(user_token: str, limit: int = 20, db: Session = Depends(get_db)):
+def order_history(
+    user_token: str,
+    cursor: Optional[str] = None,
+    limit: int = limit_param(20),
+    db: Session = Depends(get_user_read_db),
+):
     # find carts for this user
-    carts_subq = db.query(Cart.id).filter(Cart.user_token == user_token).subquery()
-
-    # fetch orders for those carts
-    orders = (
-        db.query(Order)
-        .filter(Order.cart_id.in_(carts_subq))
-        .order_by(Order.created_at.desc())
-        .limit(limit)
-        .all()
-    )
+    cart_ids = select(Cart.id).where(Cart.user_token == user_token)
+    orders, next_cursor = _history_orders(db, cart_ids, limit, cursor)
 
     result: List[OrderHistoryItem] = []
-    for o in orders:
+    for order_id, status, total_gross_paise, created_at, payment_id, archived in orders:
         # fetch lines + vendor/menu names
-        rows = (
-            db.query(OrderLine, Vendor.name.label("vendor_name"), Menu.item_name.label("item_name"))
-            .join(Vendor, OrderLine.vendor_id == Vendor.id)
-            .join(Menu, OrderLine.menu_id == Menu.id)
-            .filter(OrderLine.order_id == o.id)
-            .all()
-        )
+        lines_table = order_lines_archive if archived else OrderLine.__table__
+        rows = db.execute(
+            select(
+                lines_table.c.qty, lines_table.c.price_paise, lines_table.c.tax_paise,
+                Vendor.name.label("vendor_name"), Menu.item_name.label("item_name"),
+            )
+            .join(Vendor, lines_table.c.vendor_id == Vendor.id)
+            .join(Menu, lines_table.c.menu_id == Menu.id)
+            .where(lines_table.c.order_id == order_id)
+        ).all()
         lines: List[OrderLineBrief] = []
         vendor_names = set()
-        for ol, vendor_name, item_name in rows:
+        for qty, price_paise, tax_paise, vendor_name, item_name in rows:
             vendor_names.add(vendor_name)
             lines.append(
                 OrderLineBrief(
                     vendor_name=vendor_name,
                     item_name=item_name,
-                    qty=ol.qty,
-                    line_total=(ol.price * ol.qty + ol.tax),
+                    qty=qty,
+                    line_total=rupees(price_paise * qty + tax_paise),
                 )
             )
         result.append(
             OrderHistoryItem(
-                order_id=o.id,
-                status=o.status.value,
-                total_gross=o.total_gross,
-                created_at=o.created_at,
-                payment_id=o.payment_id,
+                order_id=order_id,
+                status=OrderStatus(status).value,
+                total_gross=rupees(total_gross_paise),
+                created_at=created_at,
+                payment_id=payment_id,
                 vendors=sorted(list(vendor_names)),
                 lines=lines,
             )
         )
-    return OrderHistoryOut(user_token=user_token, orders=result)
+    response = ModelResponse(OrderHistoryOut(user_token=user_token, orders=result, next_cursor=next_cursor))
+    set_next_cursor(response, next_cursor)
+    return response
+
+@router.get("/{order_id}", response_model=OrderStatusOut)
+def get_order(order_id: int, db: Session = Depends(get_db)):
+    order = db.query(Order.id, Order.status, Order.total_gross_paise).filter(Order.id == order_id).first()
+    if not order:
+        # Finished orders move to the archive after ORDER_ARCHIVE_AFTER_MONTHS
+        a = orders_archive
+        order = db.execute(
+            select(a.c.id, a.c.status, a.c.total_gross_paise)
+            .where(a.c.id == order_id, a.c.court_id == db.info["court_id"])
+        ).first()
+    if not order:
+        raise HTTPException(404, "Order not found")
+    order_id, status, total_gross_paise = order
+    return OrderStatusOut(order_id=order_id, status=OrderStatus(status).value, total_gross=rupees(total_gross_paise))
+
+# Support override: mark paid by hand (X-Admin-Token). Payments normally arrive via
+# /payments/webhook; scripts/fake_gateway.py simulates one locally.
+@router.post("/{order_id}/mark-paid", response_model=OrderStatusOut, dependencies=[Depends(require_admin)])
+def mark_paid(order_id: int, db: Session = Depends(get_db)):
+    order = db.query(Order).filter(Order.id == order_id).first()
+    if not order:
+        raise HTTPException(404, "Order not found")
+    order.status = OrderStatus.paid
+    order_status_event(db, order, source="mark-paid", source_key=uuid4().hex)
+    db.commit()
+    return OrderStatusOut(order_id=order.id, status=order.status.value, total_gross=rupees(order.total_gross_paise))
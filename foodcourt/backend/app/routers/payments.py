@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+import hashlib
+import hmac
+from app import deadlines
+from app.db import settings, shard_session
+from app.outbox import enqueue
+from app.tenancy import court_for_order
+from app.schemas import PaymentWebhookIn, WebhookAckOut
+
+router = APIRouter(prefix="/payments", tags=["payments"])
+
+def _check_signature(body: bytes, signature: str | None):
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        if settings.PAYMENT_WEBHOOK_ALLOW_UNSIGNED:
+            return
+        raise HTTPException(503, "Payment webhook is not configured")
+    expected = hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    if not signature or not hmac.compare_digest(expected, signature):
+        raise HTTPException(401, "Invalid signature")
+
+@router.post("/webhook", response_model=WebhookAckOut, status_code=202)
+async def payment_webhook(request: Request):
+    """Gateway callback: verify, enqueue and ack. The outbox worker applies it.
+
+    The gateway sends no court, so the event is queued on the shard that holds
+    the order, where that shard's outbox worker can apply it.
+    """
+    body = await request.body()
+    _check_signature(body, request.headers.get("X-Signature"))
+    try:
+        payload = PaymentWebhookIn.model_validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+    def _store() -> bool:
+        court = court_for_order(payload.order_id)
+        if court is None:
+            raise HTTPException(404, "Order not found")
+        if court.status == "moving":
+            raise HTTPException(503, "Food court is being migrated, retry shortly", headers={"Retry-After": "30"})
+        with shard_session(court.shard) as db:
+            db.info["court_id"] = court.id
+            deadlines.start(db, request)
+            queued = enqueue(db, "payment.webhook", f"payment:{payload.event_id}", payload.model_dump(mode="json"))
+            db.commit()
+        return queued
+
+    queued = await run_in_threadpool(_store)
+    return WebhookAckOut(event_id=payload.event_id, accepted=True, duplicate=not queued)
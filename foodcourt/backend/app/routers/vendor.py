@@ -1,13 +1,22 @@
 # foodcourt/backend/app/routers/vendor.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from decimal import Decimal
-from app.db import get_db
+from app.db import get_db, get_read_db
 from app.models import Vendor, Menu, Order, OrderLine, OrderStatus
-from typing import List, Optional
+from typing import List, Optional, Literal
+from uuid import uuid4
 from sqlalchemy import func
-from pydantic import BaseModel
+from pydantic import BaseModel, conint
+from app.admission import admission
+from app.fastjson import ModelResponse, FastJSONResponse
+from app.money import to_paise, rupees
+from app.outbox import order_status_event
+from app.analytics import business_day_start, sales_series
+from app import search
+from app.cart_store import cart_store
+from app.pagination import decode_cursor, encode_cursor, keyset_page, limit_param, set_next_cursor
 
 router = APIRouter(prefix="/vendor", tags=["vendor"])
 
@@ -15,6 +24,11 @@ router = APIRouter(prefix="/vendor", tags=["vendor"])
 class UpdateMenuPriceIn(BaseModel):
     price: Optional[Decimal] = None
     is_active: Optional[bool] = None
+    category: Optional[str] = None
+    gst_rate_bp: Optional[conint(ge=0, le=10000)] = None  # basis points; overrides the vendor rate, null clears
+
+class UpdateVendorTaxIn(BaseModel):
+    gst_rate_bp: conint(ge=0, le=10000)
 
 class UpdateOrderStatusIn(BaseModel):
     status: str
@@ -24,23 +38,31 @@ class AddMenuItemIn(BaseModel):
     price: Decimal
     category: Optional[str] = "General"
     is_active: bool = True
+    gst_rate_bp: Optional[conint(ge=0, le=10000)] = None
 
 class MenuOut(BaseModel):
     id: int
     vendor_id: int
     item_name: str
+    category: str
     price: Decimal
     is_active: bool
+    gst_rate_bp: Optional[int] = None
     
     class Config:
         from_attributes = True
 
+class OrderItemOut(BaseModel):
+    name: str
+    qty: int
+    price: Decimal
+
 class OrderDetailOut(BaseModel):
     order_id: int
     status: str
     total_gross: Decimal
     customer_name: Optional[str] = "Customer"
-    items: List[dict]
+    items: List[OrderItemOut]
     created_at: datetime
     table_no: Optional[str] = None
 
@@ -68,7 +90,7 @@ def _get_vendor(db: Session, vendor_id: int) -> Vendor:
 # ============= Dashboard Endpoints =============
 
 @router.get("/{vendor_id}/dashboard", response_model=VendorDashboardOut)
-def get_vendor_dashboard(vendor_id: int, db: Session = Depends(get_db)):
+def get_vendor_dashboard(vendor_id: int, db: Session = Depends(get_read_db)):
     """Get vendor dashboard with key metrics"""
     vendor = _get_vendor(db, vendor_id)
     
@@ -84,13 +106,13 @@ def get_vendor_dashboard(vendor_id: int, db: Session = Depends(get_db)):
     total_orders = total_orders_query.count()
     
     # Total revenue today
-    total_revenue_result = db.query(func.sum(Order.total_gross)).join(
+    total_revenue_result = db.query(func.sum(Order.total_gross_paise)).join(
         OrderLine, OrderLine.order_id == Order.id
     ).filter(
         OrderLine.vendor_id == vendor_id,
         Order.created_at >= today_start
     ).scalar()
-    total_revenue = Decimal(total_revenue_result) if total_revenue_result else Decimal("0")
+    total_revenue = rupees(total_revenue_result)
     
     # Pending orders
     pending_orders_query = db.query(Order).join(
@@ -127,7 +149,7 @@ def get_vendor_dashboard(vendor_id: int, db: Session = Depends(get_db)):
     )
 
 @router.get("/{vendor_id}/stats", response_model=VendorStatsOut)
-def get_vendor_stats(vendor_id: int, db: Session = Depends(get_db)):
+def get_vendor_stats(vendor_id: int, db: Session = Depends(get_read_db)):
     """Get quick stats for vendor"""
     vendor = _get_vendor(db, vendor_id)
     
@@ -148,13 +170,13 @@ def get_vendor_stats(vendor_id: int, db: Session = Depends(get_db)):
         Order.created_at >= today
     ).count()
     
-    revenue_result = db.query(func.sum(Order.total_gross)).join(
+    revenue_result = db.query(func.sum(Order.total_gross_paise)).join(
         OrderLine, OrderLine.order_id == Order.id
     ).filter(
         OrderLine.vendor_id == vendor_id,
         Order.created_at >= today
     ).scalar()
-    revenue = float(revenue_result) if revenue_result else 0.0
+    revenue = (revenue_result or 0) / 100
     
     pending_orders = db.query(Order).join(
         OrderLine, OrderLine.order_id == Order.id
@@ -179,10 +201,11 @@ def get_vendor_stats(vendor_id: int, db: Session = Depends(get_db)):
 def get_vendor_orders(
     vendor_id: int,
     status: Optional[str] = Query(None),
-    limit: int = Query(20),
+    cursor: Optional[str] = None,
+    limit: int = limit_param(20),
     db: Session = Depends(get_db)
 ):
-    """Get all orders for a vendor"""
+    """Get orders for a vendor, newest first"""
     vendor = _get_vendor(db, vendor_id)
     
     query = db.query(Order).join(
@@ -192,7 +215,9 @@ def get_vendor_orders(
     if status:
         query = query.filter(Order.status == status)
     
-    orders = query.order_by(Order.created_at.desc()).limit(limit).all()
+    orders, next_cursor = keyset_page(
+        query, [Order.created_at, Order.id], lambda o: (o.created_at, o.id), cursor, limit, descending=True
+    )
     
     result = []
     for order in orders:
@@ -206,18 +231,19 @@ def get_vendor_orders(
         result.append(OrderDetailOut(
             order_id=order.id,
             status=order.status.value,
-            total_gross=order.total_gross,
+            total_gross=rupees(order.total_gross_paise),
             customer_name="Customer",
-            items=[{
-                "name": menu.item_name,
-                "qty": ol.qty,
-                "price": str(ol.price)
-            } for ol, menu in lines],
+            items=[
+                OrderItemOut(name=menu.item_name, qty=ol.qty, price=rupees(ol.price_paise))
+                for ol, menu in lines
+            ],
             created_at=order.created_at,
             table_no="T-5"
         ))
     
-    return result
+    response = ModelResponse(result)
+    set_next_cursor(response, next_cursor)
+    return response
 
 @router.patch("/{vendor_id}/orders/{order_id}/status")
 def update_order_status(
@@ -247,22 +273,45 @@ def update_order_status(
         raise HTTPException(400, f"Invalid status. Must be one of {valid_statuses}")
     
     order.status = OrderStatus[payload.status]
+    order_status_event(db, order, source=f"vendor:{vendor_id}", source_key=uuid4().hex)
     db.commit()
     db.refresh(order)
     
     return {
         "order_id": order.id,
         "status": order.status.value,
-        "total_gross": str(order.total_gross)
+        "total_gross": str(rupees(order.total_gross_paise))
     }
 
+@router.patch("/{vendor_id}/tax")
+def update_vendor_tax(
+    vendor_id: int,
+    payload: UpdateVendorTaxIn,
+    db: Session = Depends(get_db)
+):
+    """Set the vendor's default GST rate (items without their own rate use it)"""
+    vendor = _get_vendor(db, vendor_id)
+    vendor.gst_rate_bp = payload.gst_rate_bp
+    db.commit()
+    return {"vendor_id": vendor.id, "gst_rate_bp": vendor.gst_rate_bp}
+
 # ============= Menu Endpoints =============
 
 @router.get("/{vendor_id}/menu", response_model=List[MenuOut])
-def get_vendor_menu(vendor_id: int, db: Session = Depends(get_db)):
-    """Get all menu items for a vendor"""
+def get_vendor_menu(
+    vendor_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = limit_param(),
+    db: Session = Depends(get_db)
+):
+    """Get menu items for a vendor"""
     vendor = _get_vendor(db, vendor_id)
-    items = db.query(Menu).filter(Menu.vendor_id == vendor_id).all()
+    items, next_cursor = keyset_page(
+        db.query(Menu).filter(Menu.vendor_id == vendor_id),
+        [Menu.item_name, Menu.id], lambda m: (m.item_name, m.id), cursor, limit,
+    )
+    set_next_cursor(response, next_cursor)
     return items
 
 @router.post("/{vendor_id}/menu", response_model=MenuOut)
@@ -277,11 +326,15 @@ def add_menu_item(
     menu = Menu(
         vendor_id=vendor_id,
         item_name=payload.item_name,
-        price=payload.price,
+        category=payload.category or "General",
+        price_paise=to_paise(payload.price),
+        gst_rate_bp=payload.gst_rate_bp,
         is_active=payload.is_active
     )
     db.add(menu)
     db.commit()
+    search.invalidate(db.info["court_id"])
+    cart_store.bump_generation(db.info["court_id"])  # cached carts show menu names and prices
     db.refresh(menu)
     return menu
 
@@ -303,11 +356,17 @@ def update_menu_item(
         raise HTTPException(404, "Menu item not found")
     
     if payload.price is not None:
-        menu.price = payload.price
+        menu.price_paise = to_paise(payload.price)
     if payload.is_active is not None:
         menu.is_active = payload.is_active
+    if payload.category is not None:
+        menu.category = payload.category
+    if "gst_rate_bp" in payload.model_fields_set:
+        menu.gst_rate_bp = payload.gst_rate_bp  # explicit null falls back to the vendor rate
     
     db.commit()
+    search.invalidate(db.info["court_id"])
+    cart_store.bump_generation(db.info["court_id"])  # cached carts show menu names and prices
     db.refresh(menu)
     return menu
 
@@ -329,40 +388,87 @@ def delete_menu_item(
     
     db.delete(menu)
     db.commit()
+    search.invalidate(db.info["court_id"])
+    cart_store.bump_generation(db.info["court_id"])  # cached carts show menu names and prices
     return {"deleted": True, "menu_id": menu_id}
 
 # ============= Analytics Endpoints =============
 
-@router.get("/{vendor_id}/analytics")
+ANALYTICS_PAGE_DAYS = 31  # max business days per analytics page, when paging
+ANALYTICS_MAX_DAYS = 366  # longest window
+
+def _day_page(days: int, cursor: Optional[str], limit: Optional[int]):
+    """Range [start, end) of the last `days` business days to answer, and the next cursor.
+
+    Without `limit` that is the whole window. With it, pages run newest first:
+    today and the limit - 1 days before it, then `limit` older days per page,
+    each page's cursor being the start of the one before.
+    """
+    window_start = business_day_start() - timedelta(days=days - 1)
+    end = datetime.now(window_start.tzinfo)
+    newest_day = business_day_start()
+    if cursor:
+        end = decode_cursor(cursor, 1)[0]
+        if not isinstance(end, datetime) or end.tzinfo is None or not window_start < end <= newest_day:
+            raise HTTPException(400, "Invalid cursor")
+        newest_day = end - timedelta(days=1)
+    if limit is None:
+        return window_start, end, None
+    start = max(window_start, newest_day - timedelta(days=limit - 1))
+    return start, end, encode_cursor([start]) if start > window_start else None
+
+@router.get("/{vendor_id}/analytics", dependencies=[Depends(admission("analytics"))])
 def get_vendor_analytics(
     vendor_id: int,
-    days: int = Query(7),
-    db: Session = Depends(get_db)
+    days: int = Query(7, ge=1, le=ANALYTICS_MAX_DAYS),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=ANALYTICS_PAGE_DAYS),
+    db: Session = Depends(get_read_db)
 ):
-    """Get analytics for past N days"""
+    """Get daily analytics for the past N business days; pass `limit` to page, newest first"""
     vendor = _get_vendor(db, vendor_id)
     
-    start_date = datetime.now() - timedelta(days=days)
-    
-    daily_revenue = db.query(
-        func.date(Order.created_at).label("date"),
-        func.sum(Order.total_gross).label("revenue"),
-        func.count(Order.id).label("orders")
-    ).join(
-        OrderLine, OrderLine.order_id == Order.id
-    ).filter(
-        OrderLine.vendor_id == vendor_id,
-        Order.created_at >= start_date
-    ).group_by(func.date(Order.created_at)).all()
+    start_date, end_date, next_cursor = _day_page(days, cursor, limit)
+    daily = sales_series(db, vendor_id, "day", start_date, end_date)
     
-    return {
+    response = FastJSONResponse({
         "daily_data": [
             {
-                "date": str(date),
-                "revenue": float(revenue) if revenue else 0,
-                "orders": orders
+                "date": row["bucket"][:10],
+                "revenue": row["revenue"],
+                "orders": row["orders"]
             }
-            for date, revenue, orders in daily_revenue
+            for row in daily
         ],
-        "period_days": days
-    }
\ No newline at end of file
+        "period_days": days,
+        "next_cursor": next_cursor
+    })
+    set_next_cursor(response, next_cursor)
+    return response
+
+@router.get("/{vendor_id}/analytics/timeseries", dependencies=[Depends(admission("analytics"))])
+def get_vendor_timeseries(
+    vendor_id: int,
+    bucket: Literal["hour", "day", "week"] = Query("day"),
+    days: int = Query(7, ge=1, le=ANALYTICS_MAX_DAYS),
+    by_item: bool = Query(False),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=ANALYTICS_PAGE_DAYS),
+    db: Session = Depends(get_read_db)
+):
+    """Get hourly/daily/weekly sales, optionally broken down per menu item; pass `limit` to page, newest first"""
+    vendor = _get_vendor(db, vendor_id)
+    
+    start_date, end_date, next_cursor = _day_page(days, cursor, limit)
+    
+    response = FastJSONResponse({
+        "bucket": bucket,
+        "timezone": str(start_date.tzinfo),
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "by_item": by_item,
+        "data": sales_series(db, vendor_id, bucket, start_date, end_date, by_item=by_item),
+        "next_cursor": next_cursor,
+    })
+    set_next_cursor(response, next_cursor)
+    return response
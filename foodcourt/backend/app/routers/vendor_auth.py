@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.db import get_db
+from app.db import get_directory_db
 from app.models import Vendor, User
 
 router = APIRouter(prefix="/vendor-auth", tags=["vendor-auth"])
 
 @router.post("/login")
-def vendor_login(email: str, password: str, db: Session = Depends(get_db)):
+def vendor_login(email: str, password: str, db: Session = Depends(get_directory_db)):
     """Authenticate vendor user"""
     # Link vendor to user account
     user = db.query(User).filter(User.email == email).first()
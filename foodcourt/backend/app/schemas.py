@@ -1,5 +1,5 @@
-from pydantic import BaseModel, conint
-from typing import List, Optional
+from pydantic import BaseModel, conint, conlist
+from typing import List, Optional, Literal
 from decimal import Decimal
 from enum import Enum
 from datetime import datetime
@@ -17,10 +17,22 @@ class MenuOut(BaseModel):
     id: int
     vendor_id: int
     item_name: str
+    category: str = "General"
     price: Decimal
     is_active: bool
     class Config: from_attributes = True
 
+class MenuSearchOut(BaseModel):
+    items: List[MenuOut]
+    total: int
+    next_cursor: Optional[str] = None
+
+class MenuSuggestionOut(BaseModel):
+    menu_id: int
+    vendor_id: int
+    item_name: str
+    category: str
+
 # Cart
 class AddToCartIn(BaseModel):
     user_token: str
@@ -31,6 +43,17 @@ class RemoveFromCartIn(BaseModel):
     user_token: str
     cart_item_id: int
 
+class CartOp(BaseModel):
+    op: Literal["add", "remove", "set_qty"]
+    menu_id: Optional[int] = None       # add needs menu_id; remove/set_qty take either id
+    cart_item_id: Optional[int] = None
+    qty: conint(ge=0) = 1               # add: increment, set_qty: absolute (0 removes)
+
+class CartBatchIn(BaseModel):
+    user_token: str
+    version: int                        # CartOut.version the client last saw
+    ops: conlist(CartOp, min_length=1, max_length=50)  # bounded: the batch holds the cart row lock
+
 class CartItemOut(BaseModel):
     id: int
     vendor_id: int
@@ -45,6 +68,7 @@ class CartOut(BaseModel):
     user_token: str
     items: List[CartItemOut]
     subtotal: Decimal
+    version: int = 0  # bumped on every change; /cart/batch rejects stale versions
 
 # Checkout & orders
 class CheckoutIn(BaseModel):
@@ -61,6 +85,20 @@ class OrderStatusOut(BaseModel):
     status: str
     total_gross: Decimal
 
+# Payments
+class PaymentWebhookIn(BaseModel):
+    event_id: str                                  # gateway's id; re-deliveries reuse it
+    order_id: int
+    status: Literal["captured", "failed"]
+    payment_id: Optional[str] = None
+    amount: Optional[Decimal] = None               # rupees; a capture must match the order total
+    currency: str = "INR"
+
+class WebhookAckOut(BaseModel):
+    event_id: str
+    accepted: bool
+    duplicate: bool
+
 class OrderLineBrief(BaseModel):
     vendor_name: str
     item_name: str
@@ -79,6 +117,7 @@ class OrderHistoryItem(BaseModel):
 class OrderHistoryOut(BaseModel):
     user_token: str
     orders: list[OrderHistoryItem]
+    next_cursor: Optional[str] = None
 
 
 class SignupIn(BaseModel):
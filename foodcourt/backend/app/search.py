@@ -0,0 +1,126 @@
+# foodcourt/backend/app/search.py
+"""
+Catalog search.
+
+search_menus filters active items by name, category, vendor and price and
+ranks name matches in Postgres: trigram similarity (pg_trgm, so typos still
+match) plus full-text rank over name and category. Both are served by GIN
+indexes on menus (see app.migrations).
+
+suggest serves typeahead from an in-memory prefix index per court: a sorted
+list of (word, menu id) searched with bisect, so a keystroke never touches
+the database. The index is dropped whenever this process edits a menu and
+rebuilt at least every SEARCH_INDEX_TTL_SECONDS.
+"""
+from bisect import bisect_left
+from dataclasses import dataclass
+import threading
+import time
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.db import settings
+from app.models import Menu
+
+SUGGEST_SCAN_LIMIT = 500  # index entries looked at per keystroke
+
+@dataclass(frozen=True)
+class Suggestion:
+    menu_id: int
+    vendor_id: int
+    item_name: str
+    category: str
+
+class PrefixIndex:
+    def __init__(self, items: list[Suggestion]):
+        self.items = {s.menu_id: s for s in items}
+        keys = set()
+        for s in items:
+            name = s.item_name.lower()
+            keys.add((name, s.menu_id))
+            keys.update((word, s.menu_id) for word in name.split())
+            keys.add((s.category.lower(), s.menu_id))
+        self.keys = sorted(keys)
+
+    def suggest(self, prefix: str, limit: int) -> list[Suggestion]:
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        hits = set()
+        i = bisect_left(self.keys, (prefix,))
+        for key, menu_id in self.keys[i:i + SUGGEST_SCAN_LIMIT]:
+            if not key.startswith(prefix):
+                break
+            hits.add(menu_id)
+        # Items whose name starts with the prefix first, then shorter names
+        ranked = sorted(
+            (self.items[i] for i in hits),
+            key=lambda s: (not s.item_name.lower().startswith(prefix), len(s.item_name), s.item_name),
+        )
+        return ranked[:limit]
+
+_lock = threading.Lock()
+_indexes: dict[str, tuple[float, PrefixIndex]] = {}
+
+def _build(db: Session) -> PrefixIndex:
+    rows = (
+        db.query(Menu.id, Menu.vendor_id, Menu.item_name, Menu.category)
+          .filter(Menu.is_active == True)
+          .all()
+    )
+    return PrefixIndex([Suggestion(*row) for row in rows])
+
+def prefix_index(db: Session) -> PrefixIndex:
+    court_id = db.info.get("court_id", settings.DEFAULT_COURT)
+    hit = _indexes.get(court_id)
+    if hit and time.monotonic() - hit[0] < settings.SEARCH_INDEX_TTL_SECONDS:
+        return hit[1]
+    index = _build(db)
+    with _lock:
+        _indexes[court_id] = (time.monotonic(), index)
+    return index
+
+def invalidate(court_id: str):
+    with _lock:
+        _indexes.pop(court_id, None)
+
+def suggest(db: Session, prefix: str, limit: int = 10) -> list[Suggestion]:
+    return prefix_index(db).suggest(prefix, limit)
+
+def search_menus(
+    db: Session,
+    q: str | None = None,
+    category: str | None = None,
+    vendor_id: int | None = None,
+    min_paise: int | None = None,
+    max_paise: int | None = None,
+    offset: int = 0,
+    limit: int = 20,
+) -> tuple[list[Menu], int]:
+    """A page of matching active items, best match first, and the total match count."""
+    query = db.query(Menu).filter(Menu.is_active == True)
+    if category:
+        query = query.filter(Menu.category == category)
+    if vendor_id:
+        query = query.filter(Menu.vendor_id == vendor_id)
+    if min_paise is not None:
+        query = query.filter(Menu.price_paise >= min_paise)
+    if max_paise is not None:
+        query = query.filter(Menu.price_paise <= max_paise)
+
+    order_by = [Menu.item_name, Menu.id]
+    q = (q or "").strip()
+    if q:
+        # Same expression as ix_menus_search_tsv, so the index applies
+        document = func.to_tsvector("simple", Menu.item_name + " " + Menu.category)
+        terms = func.plainto_tsquery("simple", q)
+        query = query.filter(or_(
+            Menu.item_name.icontains(q, autoescape=True),
+            Menu.item_name.op("%")(q),
+            document.op("@@")(terms),
+        ))
+        rank = func.similarity(Menu.item_name, q) + func.ts_rank(document, terms)
+        order_by.insert(0, rank.desc())
+
+    total = query.count()
+    items = query.order_by(*order_by).offset(offset).limit(limit).all()
+    return items, total
@@ -1,5 +1,4 @@
 from sqlalchemy.orm import Session
-from decimal import Decimal
 from app.models import Vendor, Menu
 
 def seed(db: Session):
@@ -11,12 +10,12 @@ def seed(db: Session):
     db.add_all([v1, v2, v3])
     db.flush()
     items = [
-        Menu(vendor_id=v1.id, item_name="Margherita", price=Decimal("199.00")),
-        Menu(vendor_id=v1.id, item_name="Farmhouse", price=Decimal("279.00")),
-        Menu(vendor_id=v2.id, item_name="Chicken Biryani", price=Decimal("249.00")),
-        Menu(vendor_id=v2.id, item_name="Veg Biryani", price=Decimal("199.00")),
-        Menu(vendor_id=v3.id, item_name="Pani Puri", price=Decimal("59.00")),
-        Menu(vendor_id=v3.id, item_name="Dahi Puri", price=Decimal("79.00")),
+        Menu(vendor_id=v1.id, item_name="Margherita", category="Pizza", price_paise=19900),
+        Menu(vendor_id=v1.id, item_name="Farmhouse", category="Pizza", price_paise=27900),
+        Menu(vendor_id=v2.id, item_name="Chicken Biryani", category="Biryani", price_paise=24900),
+        Menu(vendor_id=v2.id, item_name="Veg Biryani", category="Biryani", price_paise=19900),
+        Menu(vendor_id=v3.id, item_name="Pani Puri", category="Chaat", price_paise=5900),
+        Menu(vendor_id=v3.id, item_name="Dahi Puri", category="Chaat", price_paise=7900),
     ]
     db.add_all(items)
     db.commit()
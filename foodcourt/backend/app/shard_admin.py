@@ -0,0 +1,161 @@
+# foodcourt/backend/app/shard_admin.py
+"""
+Move a food court to another shard.
+
+    python -m app.shard_admin move --court forum-mall --to shard2
+
+Steps:
+
+1. mark the court "moving": its writes get 503 once every process has
+   dropped its cached directory entry (COURT_CACHE_SECONDS), and the shard's
+   background writers (outbox worker, cart purge, order archival) stop
+   touching its rows, since they only work on app.tenancy.served_courts;
+2. let the last orders settle and fold them into the rollups on both shards,
+   so the copied rollup rows are complete and the target's watermark is
+   already past every copied order (it will not count them twice). Later
+   refreshes only fold newer orders, so they cannot change the court's rows;
+3. copy the court's rows in foreign-key order, all read from one REPEATABLE
+   READ snapshot of the old shard. Ids are kept as they are: every shard
+   allocates from its own id range (app.tenancy.ID_RANGE). The court's
+   outbox events come along: pending ones are handled on the new shard, done
+   ones keep deduplicating redelivered webhooks there;
+4. point the directory at the new shard and reopen writes;
+5. after the caches have expired again, delete the rows from the old shard
+   in one transaction. Nothing may have changed them since the copy: if the
+   deleted counts differ from the copied ones, the delete is rolled back and
+   the move fails with the old rows left in place for inspection.
+"""
+import argparse
+import logging
+import time
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import Connection
+from app.analytics import refresh_rollups
+from app.db import SessionLocal, settings, shard_engines, shard_session
+from app.models import (
+    Court, Vendor, Menu, Cart, CartItem, Order, OrderLine, VendorSalesHourly, ItemSalesHourly, RollupState,
+    OutboxEvent,
+)
+from app.partitions import ensure_partitions, orders_archive, order_lines_archive
+from app import tenancy
+
+log = logging.getLogger(__name__)
+
+COPY_BATCH = 1000
+
+def _set_court(court_id: str, **values):
+    with SessionLocal() as db:
+        db.query(Court).filter(Court.id == court_id).update(values)
+        db.commit()
+    tenancy.invalidate(court_id)
+
+def _court_rows(court_id: str):
+    """(table, select of the court's rows) in foreign-key order."""
+    vendors = Vendor.__table__
+    carts = Cart.__table__
+    orders = Order.__table__
+    vendor_ids = select(vendors.c.id).where(vendors.c.court_id == court_id)
+    cart_ids = select(carts.c.id).where(carts.c.court_id == court_id)
+    order_ids = select(orders.c.id).where(orders.c.court_id == court_id)
+    archived_ids = select(orders_archive.c.id).where(orders_archive.c.court_id == court_id)
+    outbox = OutboxEvent.__table__
+    event_order = outbox.c.payload["order_id"].as_integer()
+    steps = [
+        (vendors, vendors.c.court_id == court_id),
+        (Menu.__table__, Menu.__table__.c.court_id == court_id),
+        (carts, carts.c.court_id == court_id),
+        (CartItem.__table__, CartItem.__table__.c.cart_id.in_(cart_ids)),
+        (orders, orders.c.court_id == court_id),
+        (OrderLine.__table__, OrderLine.__table__.c.order_id.in_(order_ids)),
+        (VendorSalesHourly.__table__, VendorSalesHourly.__table__.c.vendor_id.in_(vendor_ids)),
+        (ItemSalesHourly.__table__, ItemSalesHourly.__table__.c.vendor_id.in_(vendor_ids)),
+        (orders_archive, orders_archive.c.court_id == court_id),
+        (order_lines_archive, order_lines_archive.c.order_id.in_(archived_ids)),
+        (outbox, or_(event_order.in_(order_ids), event_order.in_(archived_ids))),
+    ]
+    return [(table, select(table).where(where)) for table, where in steps]
+
+def _copy(src: Connection, dst: Connection, court_id: str) -> dict:
+    copied = {}
+    for table, query in _court_rows(court_id):
+        rows = src.execution_options(stream_results=True).execute(query)
+        n = 0
+        while batch := rows.fetchmany(COPY_BATCH):
+            dst.execute(table.insert(), [dict(r._mapping) for r in batch])
+            n += len(batch)
+        copied[table.name] = n
+    return copied
+
+def _delete(conn: Connection, court_id: str) -> dict:
+    deleted = {}
+    for table, query in reversed(_court_rows(court_id)):
+        deleted[table.name] = conn.execute(table.delete().where(query.whereclause)).rowcount
+    return deleted
+
+def _newest_order(shard: str, court_id: str):
+    orders = Order.__table__
+    with shard_engines[shard].connect() as conn:
+        return conn.execute(select(func.max(orders.c.created_at)).where(orders.c.court_id == court_id)).scalar()
+
+def _check_watermark(shard: str, newest):
+    with shard_engines[shard].connect() as conn:
+        watermark = conn.execute(select(func.max(RollupState.__table__.c.watermark))).scalar()
+    if newest and (watermark is None or watermark <= newest):
+        raise RuntimeError(f"rollups on shard {shard} are behind the moved orders; retry the move")
+
+def move_court(court_id: str, target: str) -> dict:
+    if target not in shard_engines:
+        raise ValueError(f"unknown shard {target!r}")
+    with SessionLocal() as db:
+        court = db.get(Court, court_id)
+        if court is None:
+            raise ValueError(f"unknown court {court_id!r}")
+        source = court.shard
+    if source == target:
+        return {"court": court_id, "shard": target, "copied": {}}
+
+    _set_court(court_id, status="moving")
+    try:
+        time.sleep(settings.COURT_CACHE_SECONDS + settings.ROLLUP_SETTLE_SECONDS)
+        for shard in (source, target):
+            with shard_session(shard) as db:
+                refresh_rollups(db)
+        newest = _newest_order(source, court_id)
+        for shard in (source, target):
+            _check_watermark(shard, newest)
+        with shard_engines[source].connect() as src, shard_engines[target].begin() as dst:
+            src.execution_options(isolation_level="REPEATABLE READ")
+            with src.begin():  # one snapshot for every table
+                oldest = src.execute(
+                    select(func.min(Order.__table__.c.created_at)).where(Order.__table__.c.court_id == court_id)
+                ).scalar()
+                ensure_partitions(dst, oldest)
+                copied = _copy(src, dst, court_id)
+        _set_court(court_id, shard=target, status="active")
+    except Exception:
+        _set_court(court_id, status="active")
+        raise
+
+    log.info("court %s moved %s -> %s: %s", court_id, source, target, copied)
+    time.sleep(settings.COURT_CACHE_SECONDS * 2)
+    with shard_engines[source].begin() as conn:
+        deleted = _delete(conn, court_id)
+        if deleted != copied:
+            raise RuntimeError(
+                f"court {court_id} changed on shard {source} after it was copied; "
+                f"left its rows there (copied {copied}, found {deleted})"
+            )
+    return {"court": court_id, "from": source, "shard": target, "copied": copied}
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m app.shard_admin")
+    sub = ap.add_subparsers(dest="command", required=True)
+    move = sub.add_parser("move", help="move a food court to another shard")
+    move.add_argument("--court", required=True)
+    move.add_argument("--to", required=True, dest="target")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(move_court(args.court, args.target))
+
+if __name__ == "__main__":
+    main()
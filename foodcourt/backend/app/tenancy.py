@@ -0,0 +1,204 @@
+# foodcourt/backend/app/tenancy.py
+"""
+Food court tenancy and shard routing.
+
+Every court lives on exactly one shard (a Postgres database with its own
+connection pool, see app.db.shard_engines). The courts directory table on
+the default shard maps court -> shard.
+
+Per request the court is resolved from, in order: the X-Court-Id header, a
+?court= query parameter, the request's user_token (query or JSON body; a
+signed-in token names its court, "forum-mall~user-7-..." or unprefixed for
+DEFAULT_COURT, guest tokens name none), the Host header (courts.host), and
+finally DEFAULT_COURT. A header or query court that contradicts the token's
+court is refused with 400 rather than reading or writing another court's
+cart. Payment webhooks carry
+none of these and are routed by order id instead (court_for_order). get_db then opens a
+session on that court's shard with session.info["court_id"] set. Two session
+hooks enforce isolation between courts that share a shard:
+
+- ORM SELECT / UPDATE / DELETE on CourtScoped models get "court_id = :court";
+- new CourtScoped rows are stamped with the court on flush.
+
+Directory lookups are cached for COURT_CACHE_SECONDS. A court that is being
+moved (status "moving") keeps serving reads from its old shard but refuses
+writes with 503 until the move finishes (see app.shard_admin). Background
+jobs that write (outbox worker, cart purge, order archival) only touch the
+courts a shard currently serves, read uncached from the directory with
+served_courts(): a moving court, and a moved court's leftover rows on its
+old shard, are left alone.
+"""
+from dataclasses import dataclass
+import json
+import threading
+import time
+from fastapi import HTTPException, Request
+from sqlalchemy import event, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, with_loader_criteria
+from app.db import Base, SessionLocal, DEFAULT_SHARD, settings, shard_engines
+from app.models import Court, CourtScoped
+
+# Shard N allocates ids from N * ID_RANGE, so rows keep their ids when a court moves.
+# Ids are 32-bit, which leaves room for 21 shards of 100M rows per table.
+ID_RANGE = 10**8
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+@dataclass(frozen=True)
+class CourtRoute:
+    id: str
+    shard: str
+    status: str
+
+_cache_lock = threading.Lock()
+_by_id: dict[str, tuple[float, CourtRoute | None]] = {}
+_by_host: dict[str, tuple[float, str | None]] = {}
+
+def _cached(cache: dict, key, load):
+    now = time.monotonic()
+    hit = cache.get(key)
+    if hit and now - hit[0] < settings.COURT_CACHE_SECONDS:
+        return hit[1]
+    value = load()
+    with _cache_lock:
+        cache[key] = (now, value)
+    return value
+
+def lookup_court(court_id: str) -> CourtRoute | None:
+    def load():
+        with SessionLocal() as db:
+            c = db.query(Court).filter(Court.id == court_id).first()
+            return CourtRoute(c.id, c.shard, c.status) if c else None
+    return _cached(_by_id, court_id, load)
+
+def _court_for_host(host: str) -> str | None:
+    def load():
+        with SessionLocal() as db:
+            return db.query(Court.id).filter(Court.host == host).scalar()
+    return _cached(_by_host, host, load)
+
+def court_from_token(token: str | None) -> str | None:
+    """Court a signed-in user's token was issued for (app.routers.auth); None for guests."""
+    if token and "~" in token:
+        return token.split("~", 1)[0]
+    if token and token.startswith("user-"):
+        return settings.DEFAULT_COURT
+    return None
+
+async def request_user_token(request: Request) -> str | None:
+    """The request's user_token, from the query string or a JSON body (dependency)."""
+    token = request.query_params.get("user_token")
+    if token is None and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = json.loads(await request.body() or b"null")  # cached for the route's own parsing
+        except ValueError:
+            return None  # the route answers the malformed body with a 422
+        if isinstance(body, dict) and isinstance(body.get("user_token"), str):
+            token = body["user_token"]
+    return token or None
+
+def court_for_request(request: Request, user_token: str | None = None) -> CourtRoute:
+    token_court = court_from_token(user_token)
+    court_id = request.headers.get("X-Court-Id") or request.query_params.get("court")
+    if court_id and token_court and court_id != token_court:
+        raise HTTPException(400, "Court does not match user token")
+    court_id = court_id or token_court
+    if not court_id:
+        host = (request.headers.get("host") or "").split(":")[0]
+        court_id = (host and _court_for_host(host)) or settings.DEFAULT_COURT
+
+    court = lookup_court(court_id)
+    if court is None:
+        raise HTTPException(404, "Unknown food court")
+    if court.status == "moving" and request.method not in _SAFE_METHODS:
+        raise HTTPException(503, "Food court is being migrated, retry shortly", headers={"Retry-After": "30"})
+    request.state.court = court
+    return court
+
+def court_for_order(order_id: int) -> CourtRoute | None:
+    """Court owning an order, for callers with no court context (payment gateway callbacks).
+
+    Ids keep their range when a court moves, so the shard that allocated the id is
+    only the first guess; the directory then names the court's current shard.
+    Archived (old, finished) orders are found too.
+    """
+    names = list(shard_engines)
+    home = order_id // ID_RANGE
+    if 0 <= home < len(names):
+        names.insert(0, names.pop(home))
+    for name in names:
+        with shard_engines[name].connect() as conn:
+            court_id = conn.execute(text("""
+                SELECT court_id FROM orders WHERE id = :id
+                UNION ALL SELECT court_id FROM orders_archive WHERE id = :id
+                LIMIT 1
+            """), {"id": order_id}).scalar()
+        if court_id is not None:
+            return lookup_court(court_id)
+    return None
+
+def served_courts(shard: str) -> list[str]:
+    """Courts living on `shard` and not being moved (uncached, for background jobs)."""
+    with SessionLocal() as db:
+        return [court_id for (court_id,) in db.query(Court.id).filter(Court.shard == shard, Court.status != "moving")]
+
+def invalidate(court_id: str | None = None):
+    with _cache_lock:
+        if court_id is None:
+            _by_id.clear()
+            _by_host.clear()
+        else:
+            _by_id.pop(court_id, None)
+
+# ---- Session hooks ----
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_court(state):
+    court_id = state.session.info.get("court_id")
+    if court_id is None or state.execution_options.get("all_courts"):
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        state.statement = state.statement.options(
+            with_loader_criteria(CourtScoped, lambda cls: cls.court_id == court_id, include_aliases=True)
+        )
+
+@event.listens_for(Session, "before_flush")
+def _stamp_court(session, flush_context, instances):
+    court_id = session.info.get("court_id")
+    if court_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, CourtScoped) and obj.court_id is None:
+            obj.court_id = court_id
+
+# ---- Shard setup ----
+def ensure_id_range(eng: Engine, index: int):
+    """Move every serial id sequence on shard `index` into its own range."""
+    if index == 0:
+        return
+    base = index * ID_RANGE
+    with eng.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if "id" not in table.c or not table.c.id.primary_key or not table.c.id.autoincrement:
+                continue
+            seq = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table.name}).scalar()
+            if seq:
+                conn.execute(text(f"SELECT setval('{seq}', GREATEST(last_value, :base)) FROM {seq}"), {"base": base})
+
+def init_shards():
+    """Create / upgrade the schema on every shard and make sure the default court exists."""
+    from app.migrations import run_migrations
+    from app.partitions import ensure_partitions
+    for index, (name, eng) in enumerate(shard_engines.items()):
+        run_migrations(eng)
+        ensure_id_range(eng, index)
+        with eng.begin() as conn:
+            ensure_partitions(conn)
+    with SessionLocal() as db:
+        db.execute(  # several workers may start at once
+            pg_insert(Court)
+            .values(id=settings.DEFAULT_COURT, name="Main food court", shard=DEFAULT_SHARD, status="active")
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        db.commit()
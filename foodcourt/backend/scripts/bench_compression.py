@@ -0,0 +1,97 @@
+# foodcourt/backend/scripts/bench_compression.py
+"""
+Bytes on the wire and time to first byte for list endpoints.
+
+Against a running backend, each URL is fetched with and without
+Accept-Encoding and the transferred size and TTFB are reported:
+
+    cd foodcourt/backend && python -m scripts.bench_compression \\
+        --base http://localhost:8000 /catalog/menus "/catalog/menus?limit=200" /catalog/vendors
+
+With --offline no server is needed: a menu listing of --items items (the
+old unpaginated response of a large court vs one default page) is run
+through app.compression.CompressionMiddleware directly.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+from app.compression import CompressionMiddleware, brotli
+from app.pagination import DEFAULT_LIMIT
+
+def fetch(base: str, path: str, encoding: str | None) -> tuple[int, float, float]:
+    """(bytes received, ms to first byte, ms total)"""
+    url = urlsplit(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+    headers = {"Accept-Encoding": encoding or "identity"}
+    t0 = time.perf_counter()
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    first = resp.read(1)
+    ttfb = (time.perf_counter() - t0) * 1000
+    size = len(first) + len(resp.read())
+    total = (time.perf_counter() - t0) * 1000
+    conn.close()
+    return size, ttfb, total
+
+def live(base: str, paths: list[str], runs: int):
+    encodings = [None, "gzip"] + (["br"] if brotli is not None else [])
+    print(f"{'path':40} {'encoding':9} {'bytes':>9} {'ttfb ms':>8} {'total ms':>9}")
+    for path in paths:
+        for enc in encodings:
+            samples = [fetch(base, path, enc) for _ in range(runs)]
+            size = samples[-1][0]
+            ttfb = statistics.median(s[1] for s in samples)
+            total = statistics.median(s[2] for s in samples)
+            print(f"{path:40} {enc or 'identity':9} {size:9d} {ttfb:8.2f} {total:9.2f}")
+
+def _menu_body(n: int) -> bytes:
+    return json.dumps([
+        {"id": i, "vendor_id": i % 40 + 1, "item_name": f"Paneer Tikka Wrap {i}", "category": "Wraps",
+         "price": "189.00", "is_active": True, "gst_rate_bp": None}
+        for i in range(n)
+    ]).encode()
+
+async def _through_middleware(body: bytes, encoding: str | None) -> tuple[int, float]:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    out = []
+    async def send(message):
+        out.append(message)
+
+    headers = [(b"accept-encoding", encoding.encode())] if encoding else []
+    t0 = time.perf_counter()
+    await CompressionMiddleware(app)({"type": "http", "headers": headers}, None, send)
+    ms = (time.perf_counter() - t0) * 1000
+    return sum(len(m.get("body", b"")) for m in out[1:]), ms
+
+def offline(items: int):
+    encodings = [None, "gzip"] + (["br"] if brotli is not None else [])
+    print(f"{'response':28} {'encoding':9} {'bytes':>9} {'added ms':>9}")
+    for label, n in ((f"all {items} items", items), (f"one page ({DEFAULT_LIMIT})", DEFAULT_LIMIT)):
+        body = _menu_body(n)
+        for enc in encodings:
+            size, ms = asyncio.run(_through_middleware(body, enc))
+            print(f"{label:28} {enc or 'identity':9} {size:9d} {ms:9.2f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="*", default=["/catalog/menus", "/catalog/vendors"])
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--offline", action="store_true")
+    ap.add_argument("--items", type=int, default=1500)
+    args = ap.parse_args()
+    if args.offline:
+        offline(args.items)
+    else:
+        live(args.base, args.paths, args.runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# foodcourt/backend/scripts/bench_serialization.py
+"""
+Micro-benchmark: cost per response of serializing a 50-order history.
+
+    cd foodcourt/backend && python -m scripts.bench_serialization
+
+Both paths build the same validated schema objects, as the handlers do.
+"response_model" then mimics FastAPI's default path: validate again against
+response_model, dump to JSON-mode Python and encode with json.dumps.
+"ModelResponse" is the app.fastjson fast path: the compiled serializer
+writes bytes directly. No database is needed.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+import json
+import timeit
+from pydantic import TypeAdapter
+from app.fastjson import ModelResponse
+from app.schemas import OrderHistoryOut, OrderHistoryItem, OrderLineBrief
+
+ORDERS = 50
+LINES_PER_ORDER = 3
+
+def build() -> OrderHistoryOut:
+    orders = []
+    for i in range(ORDERS):
+        lines = [
+            OrderLineBrief(vendor_name="Pizza Hub", item_name=f"Item {j}", qty=2, line_total=Decimal("417.90"))
+            for j in range(LINES_PER_ORDER)
+        ]
+        orders.append(OrderHistoryItem(
+            order_id=i, status="paid", total_gross=Decimal("1253.70"),
+            created_at=datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc), payment_id=f"STUB-{i}",
+            vendors=["Pizza Hub"], lines=lines,
+        ))
+    return OrderHistoryOut(user_token="user-1-abc", orders=orders)
+
+_adapter = TypeAdapter(OrderHistoryOut)
+
+_history = build()
+
+def response_model_path() -> bytes:
+    value = _adapter.validate_python(_history, from_attributes=True)
+    content = _adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def model_response_path() -> bytes:
+    return ModelResponse(_history).body
+
+def main(number: int = 2000):
+    assert json.loads(response_model_path()) == json.loads(model_response_path())
+    print(f"building the schema objects (both paths): {min(timeit.repeat(build, number=200, repeat=3)) / 200 * 1e6:.1f} us")
+    for name, fn in (("response_model", response_model_path), ("ModelResponse", model_response_path)):
+        secs = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:>15}: {secs * 1e6:8.1f} us/response  ({len(fn())} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# foodcourt/backend/scripts/fake_gateway.py
+"""
+Local fake payment gateway: fires webhooks at a running backend and measures
+ack latency and how long the outbox worker takes to drain them.
+
+    python -m scripts.fake_gateway --orders 1 2 3 --duplicates 2 \\
+        --base http://localhost:8000 --admin-token $ADMIN_TOKEN
+
+Each order gets one "captured" event for its total (read from GET
+/orders/{id}), re-delivered --duplicates extra times with the same event_id,
+so dedupe can be checked in the acks. Set PAYMENT_WEBHOOK_SECRET to the
+backend's value to sign requests; a backend without a secret only accepts
+them with PAYMENT_WEBHOOK_ALLOW_UNSIGNED=1.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import time
+import urllib.request
+from uuid import uuid4
+
+def _post(url: str, body: bytes, headers: dict) -> dict:
+    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+def _get(url: str, headers: dict) -> dict:
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as resp:
+        return json.loads(resp.read())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--orders", type=int, nargs="+", required=True)
+    ap.add_argument("--duplicates", type=int, default=1)
+    ap.add_argument("--admin-token", default=os.getenv("ADMIN_TOKEN"))
+    args = ap.parse_args()
+
+    secret = os.getenv("PAYMENT_WEBHOOK_SECRET")
+    latencies, duplicates = [], 0
+    started = time.perf_counter()
+    for order_id in args.orders:
+        order = _get(f"{args.base}/orders/{order_id}", {})
+        event = {
+            "event_id": f"evt_{uuid4().hex}",
+            "order_id": order_id,
+            "status": "captured",
+            "payment_id": f"pay_{uuid4().hex[:12]}",
+            "amount": order["total_gross"],
+            "currency": "INR",
+        }
+        body = json.dumps(event).encode()
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            headers["X-Signature"] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        for _ in range(1 + args.duplicates):
+            t0 = time.perf_counter()
+            ack = _post(f"{args.base}/payments/webhook", body, headers)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            duplicates += ack["duplicate"]
+    sent_secs = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"sent {len(latencies)} webhooks in {sent_secs:.2f}s, {duplicates} acked as duplicate")
+    print(f"ack latency ms: p50={statistics.median(latencies):.1f} p99={p99:.1f}")
+
+    if args.admin_token:
+        headers = {"X-Admin-Token": args.admin_token}
+        while True:
+            status = _get(f"{args.base}/admin/outbox", headers)
+            if status["pending"] == 0:
+                break
+            time.sleep(0.1)
+        print(f"outbox drained {time.perf_counter() - started:.2f}s after the first webhook; worker: {status['worker']}")
+
+if __name__ == "__main__":
+    main()
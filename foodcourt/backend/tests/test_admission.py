@@ -0,0 +1,141 @@
+# foodcourt/backend/tests/test_admission.py
+"""
+Admission control under an abusive burst.
+
+Drives the admission() dependency directly (no server, no database): one
+client hammers /cart while well-behaved clients keep shopping. The abuser
+must be answered with 429s, rotating user_token must only buy it the per-IP
+ceiling, and the others must all be served with bounded latency. Shoppers
+sharing one address (a NAT) keep separate buckets.
+"""
+import asyncio
+import statistics
+import time
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from app import admission as adm
+
+WORK_SECONDS = 0.01  # simulated handler time while holding the admission slot
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(adm, "bucket_store", adm.InMemoryBucketStore())
+    monkeypatch.setattr(adm, "limiter", adm.ConcurrencyLimiter(32, adm.ROUTE_CLASSES))
+
+def _request(ip: str, path: str = "/cart/add", query: str = "", body: bytes = b"{}",
+             headers: dict[str, str] | None = None) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [(b"content-type", b"application/json")]
+                   + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "query_string": query.encode(),
+        "client": (ip, 40000),
+    }, receive)
+
+async def _call(route_class: str, request: Request) -> tuple[int, float]:
+    """(status, seconds) of one request through admission plus WORK_SECONDS of handler."""
+    started = time.perf_counter()
+    gen = adm.admission(route_class)(request)
+    try:
+        await gen.__anext__()
+    except HTTPException as exc:
+        return exc.status_code, time.perf_counter() - started
+    try:
+        await asyncio.sleep(WORK_SECONDS)
+    finally:
+        await gen.aclose()
+    return 200, time.perf_counter() - started
+
+async def _abuser(n: int) -> list[int]:
+    async def one(i):
+        await asyncio.sleep(i * 0.001)
+        status, _ = await _call("cart", _request("10.0.0.66", query=f"user_token=guest-{i}"))
+        return status
+    return await asyncio.gather(*(one(i) for i in range(n)))
+
+async def _shopper(ip: str, requests: int) -> list[tuple[int, float]]:
+    results = []
+    for _ in range(requests):
+        results.append(await _call("cart", _request(ip)))
+        await asyncio.sleep(0.02)
+    return results
+
+def test_burst_is_throttled_and_others_keep_latency(monkeypatch):
+    # One token's worth per IP: the abuser's admitted burst stays as short as without rotation
+    monkeypatch.setattr(adm.settings, "ADMISSION_IP_MULTIPLIER", 1)
+
+    async def scenario():
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            _abuser(300),
+            *(_shopper(f"10.0.1.{i}", 5) for i in range(10)),
+        )
+        return time.perf_counter() - started, results
+
+    elapsed, (abuser, *shoppers) = asyncio.run(scenario())
+    cart = adm.ROUTE_CLASSES["cart"]
+
+    # Rotating user_token gets a fresh token bucket each time, but not past the IP ceiling
+    ceiling = cart.burst + cart.rate * elapsed
+    assert abuser.count(200) <= ceiling + 5
+    assert abuser.count(429) >= len(abuser) - ceiling - 5
+
+    served = [r for results in shoppers for r in results]
+    assert all(status == 200 for status, _ in served)
+    latencies = sorted(seconds for _, seconds in served)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < WORK_SECONDS + 0.1, f"p99 {p99 * 1000:.1f} ms, median {statistics.median(latencies) * 1000:.1f} ms"
+
+def test_login_bucket_is_per_client_not_per_email():
+    login = b'{"email": "victim@example.com", "password": "guess"}'
+
+    async def scenario():
+        # An attacker submits the victim's email until throttled...
+        attacker = [await _call("auth", _request("10.0.0.66", "/auth/login", body=login)) for _ in range(10)]
+        # ...which must not lock the victim out from their own address
+        victim = await _call("auth", _request("10.0.2.1", "/auth/login", body=login))
+        return attacker, victim
+
+    attacker, (victim_status, _) = asyncio.run(scenario())
+    assert [s for s, _ in attacker].count(429) > 0
+    assert victim_status == 200
+
+def test_shoppers_behind_one_nat_keep_their_own_buckets():
+    cart = adm.ROUTE_CLASSES["cart"]
+
+    async def shopper(i):
+        body = f'{{"user_token": "user-{i}", "menu_id": 1, "qty": 1}}'.encode()
+        return [(await _call("cart", _request("10.0.3.1", body=body)))[0] for _ in range(cart.burst)]
+
+    async def scenario():
+        return await asyncio.gather(*(shopper(i) for i in range(15)))
+
+    # 15 shoppers x a full burst each from one address: under the per-IP ceiling
+    assert all(status == 200 for statuses in asyncio.run(scenario()) for status in statuses)
+
+def test_forwarded_for_is_only_believed_from_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(adm.settings, "ADMISSION_TRUSTED_PROXIES", "10.8.0.0/16")
+    spoofed = {"X-Forwarded-For": "203.0.113.9"}
+    assert adm._client_ip(_request("198.51.100.7", headers=spoofed)) == "198.51.100.7"
+    assert adm._client_ip(_request("10.8.0.2", headers=spoofed)) == "203.0.113.9"
+    # The client's own hop list is ignored left of the first untrusted address
+    chain = {"X-Forwarded-For": "1.1.1.1, 203.0.113.9, 10.8.0.5"}
+    assert adm._client_ip(_request("10.8.0.2", headers=chain)) == "203.0.113.9"
+
+    async def scenario():
+        login = b'{"email": "a@example.com", "password": "x"}'
+        first = [await _call("auth", _request("10.8.0.2", "/auth/login", body=login,
+                                               headers={"X-Forwarded-For": "203.0.113.9"})) for _ in range(10)]
+        other = await _call("auth", _request("10.8.0.2", "/auth/login", body=login,
+                                             headers={"X-Forwarded-For": "203.0.113.10"}))
+        return first, other
+
+    # Two clients behind the same proxy are throttled separately
+    first, (other_status, _) = asyncio.run(scenario())
+    assert [s for s, _ in first].count(429) > 0
+    assert other_status == 200
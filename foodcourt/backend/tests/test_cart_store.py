@@ -0,0 +1,125 @@
+# foodcourt/backend/tests/test_cart_store.py
+"""
+The cart store's contract, on the in-process store (no server, no redis).
+
+Bounded by bytes with LRU eviction, entries expire, a put never replaces a
+newer cart version, invalidate() leaves a tombstone that refuses stale puts,
+a menu edit moves a court's carts to new keys, and a failing remote store
+reads as a miss so GET /cart falls back to Postgres.
+"""
+import pytest
+from app import cart_store as cs
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cs.time, "monotonic", clock)
+    return clock
+
+def _store(max_bytes: int = 10_000, ttl: float = 60) -> cs.InMemoryCartStore:
+    return cs.InMemoryCartStore(max_bytes, ttl)
+
+def test_least_recently_used_carts_are_evicted_by_bytes():
+    body = b"x" * 100
+    size = len("k0") + len(body) + cs.InMemoryCartStore._ENTRY_OVERHEAD
+    store = _store(max_bytes=3 * size)
+    for i in range(3):
+        store.put(f"k{i}", body, 1)
+    assert store.get("k0") == body  # k1 is now the least recently used
+    store.put("k3", body, 1)
+    assert store.get("k1") is None
+    assert [store.get(k) for k in ("k0", "k2", "k3")] == [body] * 3
+    stats = store.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (3, 3 * size, 1)
+
+def test_oversized_cart_is_not_cached():
+    store = _store(max_bytes=200)
+    store.put("k", b"x" * 500, 1)
+    assert store.get("k") is None
+    assert store.stats()["bytes"] == 0
+
+def test_entries_expire(clock):
+    store = _store(ttl=60)
+    store.put("k", b"cart", 1)
+    clock.now += 59
+    assert store.get("k") == b"cart"
+    clock.now += 2
+    assert store.get("k") is None
+    assert store.stats()["expired"] == 1
+
+def test_put_never_replaces_a_newer_version():
+    store = _store()
+    store.put("k", b"v2", 2)
+    store.put("k", b"v1", 1)
+    assert store.get("k") == b"v2"
+    store.put("k", b"v3", 3)
+    assert store.get("k") == b"v3"
+
+def test_tombstone_refuses_stale_puts():
+    store = _store()
+    store.put("k", b"before checkout", 4)
+    store.invalidate("k", 5)
+    assert store.get("k") is None
+    store.put("k", b"before checkout", 4)  # a GET that read the cart before checkout
+    assert store.get("k") is None
+    store.put("k", b"empty cart", 5)
+    assert store.get("k") == b"empty cart"
+
+def test_menu_edit_moves_court_carts_to_new_keys(monkeypatch):
+    store = _store()
+    monkeypatch.setattr(cs, "cart_store", store)
+    key = cs.cart_key("main", "guest-1")
+    store.put(key, b"old prices", 1)
+    other = cs.cart_key("forum-mall", "guest-1")
+    store.bump_generation("main")
+    assert cs.cart_key("main", "guest-1") != key
+    assert store.get(cs.cart_key("main", "guest-1")) is None
+    assert cs.cart_key("forum-mall", "guest-1") == other
+
+class BrokenStore(cs.InMemoryCartStore):
+    def __init__(self):
+        super().__init__(10_000, 60)
+        self.up = True
+
+    def _check(self):
+        if not self.up:
+            raise ConnectionError("store unreachable")
+
+    def get(self, key):
+        self._check()
+        return super().get(key)
+
+    def put(self, key, body, version):
+        self._check()
+        super().put(key, body, version)
+
+    def generation(self, court_id):
+        self._check()
+        return super().generation(court_id)
+
+    def bump_generation(self, court_id):
+        self._check()
+        super().bump_generation(court_id)
+
+def test_failing_store_reads_as_miss(monkeypatch):
+    inner = BrokenStore()
+    store = cs.FailOpenCartStore(inner)
+    monkeypatch.setattr(cs, "cart_store", store)
+    key = cs.cart_key("main", "guest-1")
+    store.put(key, b"cart", 1)
+    inner.up = False
+    assert store.get(key) is None  # GET /cart then reads Postgres
+    store.put(key, b"newer cart", 2)
+    store.invalidate(key, 3)
+    store.bump_generation("main")
+    assert cs.cart_key("main", "guest-1") is None  # not cached while the generation is unknown
+    assert store.get(None) is None
+    inner.up = True
+    assert store.get(key) == b"cart"
@@ -0,0 +1,138 @@
+# foodcourt/backend/tests/test_deadlines.py
+"""
+Request deadlines without a database.
+
+The timeout hook runs against a recording cursor on a fake connection: it
+sets the timeouts on a transaction's first statement, only again once the
+time left falls TIMEOUT_SLACK_MS below them, and refuses statements past the
+deadline. The 503 handlers are called directly and must count per route.
+"""
+import asyncio
+from collections import defaultdict
+from types import SimpleNamespace
+import pytest
+from sqlalchemy.exc import DBAPIError
+from starlette.requests import Request
+from app import deadlines
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class Cursor:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    def execute(self, sql: str):
+        self.sent.append(sql)
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(deadlines.time, "monotonic", clock)
+    return clock
+
+@pytest.fixture(autouse=True)
+def fresh_counters(monkeypatch):
+    monkeypatch.setattr(deadlines, "timeouts", defaultdict(deadlines.Counter))
+
+def _request(path: str = "/cart", method: str = "GET", headers: dict[str, str] | None = None,
+             route: str | None = None) -> Request:
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "scheme": "http",
+        "server": ("testserver", 80),
+    }
+    if route:
+        scope["route"] = SimpleNamespace(path=route)
+    return Request(scope)
+
+def _execute(conn, cursor):
+    deadlines._set_timeouts(conn, cursor, "SELECT 1", {}, None, False)
+
+def _budget_left(db, clock: Clock) -> float:
+    return round((db.info["deadline"] - clock.now) * 1000)
+
+def test_deadline_header_shortens_the_route_budget(clock):
+    db = SimpleNamespace(info={})
+    deadlines.start(db, _request("/checkout", "POST", {deadlines.DEADLINE_HEADER: "120"}))
+    assert _budget_left(db, clock) == 120
+    assert db.info["route"] == "POST /checkout"
+    deadlines.start(db, _request("/checkout", "POST", {deadlines.DEADLINE_HEADER: "60000"}))
+    assert _budget_left(db, clock) == 500
+
+@pytest.mark.parametrize("value", ["0", "-5", "soon"])
+def test_unusable_deadline_header_is_ignored(clock, value):
+    db = SimpleNamespace(info={})
+    deadlines.start(db, _request("/cart", headers={deadlines.DEADLINE_HEADER: value}))
+    assert _budget_left(db, clock) == 300
+
+def test_timeouts_are_set_once_until_the_budget_runs_down(clock):
+    conn, cursor = SimpleNamespace(info={"deadline": (clock.now + 1.0, "GET /cart")}), Cursor()
+    _execute(conn, cursor)
+    assert cursor.sent == ["SET LOCAL statement_timeout = 1000; SET LOCAL lock_timeout = 1000"]
+    clock.now += (deadlines.TIMEOUT_SLACK_MS - 10) / 1000
+    _execute(conn, cursor)
+    _execute(conn, cursor)
+    assert len(cursor.sent) == 1
+    clock.now += 0.02  # now more than the slack below the timeout set
+    _execute(conn, cursor)
+    assert cursor.sent[-1] == "SET LOCAL statement_timeout = 940; SET LOCAL lock_timeout = 940"
+
+def test_new_transaction_sets_timeouts_again(clock):
+    session = SimpleNamespace(info={"deadline": clock.now + 1.0, "route": "GET /cart"})
+    conn, cursor = SimpleNamespace(info={}), Cursor()
+    deadlines._attach_deadline(session, None, conn)
+    _execute(conn, cursor)
+    deadlines._attach_deadline(session, None, conn)
+    _execute(conn, cursor)
+    deadlines._savepoint_rolled_back(conn, "sp1", None)
+    _execute(conn, cursor)
+    assert len(cursor.sent) == 3
+
+def test_statement_after_deadline_is_refused(clock):
+    conn, cursor = SimpleNamespace(info={"deadline": (clock.now + 0.1, "GET /cart")}), Cursor()
+    clock.now += 0.1
+    with pytest.raises(deadlines.DeadlineExceeded):
+        _execute(conn, cursor)
+    assert cursor.sent == []
+
+def test_connection_without_deadline_is_untouched():
+    conn, cursor = SimpleNamespace(info={}), Cursor()
+    _execute(conn, cursor)
+    assert cursor.sent == []
+
+class PgError(Exception):
+    def __init__(self, pgcode: str):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+def test_timeouts_answer_503_and_count_per_route():
+    analytics = _request("/vendor/1/analytics", route="/vendor/{vendor_id}/analytics")
+    cancelled = DBAPIError("SELECT 1", {}, PgError("57014"))
+    lock_wait = DBAPIError("UPDATE carts", {}, PgError("55P03"))
+    responses = [
+        asyncio.run(deadlines.db_error_handler(analytics, cancelled)),
+        asyncio.run(deadlines.db_error_handler(analytics, cancelled)),
+        asyncio.run(deadlines.db_error_handler(_request("/cart/add", "POST", route="/cart/add"), lock_wait)),
+        asyncio.run(deadlines.deadline_exceeded_handler(_request("/cart", route="/cart"), deadlines.DeadlineExceeded())),
+    ]
+    assert [(r.status_code, r.headers["retry-after"]) for r in responses] == [(503, "1")] * 4
+    assert deadlines.snapshot()["timeouts"] == {
+        "GET /cart": {"expired": 1},
+        "GET /vendor/{vendor_id}/analytics": {"statement": 2},
+        "POST /cart/add": {"lock": 1},
+    }
+
+def test_other_database_errors_are_not_timeouts():
+    error = DBAPIError("INSERT", {}, PgError("23505"))  # unique_violation
+    with pytest.raises(DBAPIError):
+        asyncio.run(deadlines.db_error_handler(_request("/auth/signup", "POST"), error))
+    assert deadlines.snapshot()["timeouts"] == {}
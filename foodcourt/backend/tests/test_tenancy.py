@@ -0,0 +1,87 @@
+# foodcourt/backend/tests/test_tenancy.py
+"""
+Court resolution for requests whose user_token is in the JSON body.
+
+A small app with the real get_db dependency is driven over ASGI (no server,
+no database: the session is never used to query). The court directory is
+replaced by a fixed pair of courts on the default shard.
+"""
+import asyncio
+import json
+import pytest
+from fastapi import Depends, FastAPI
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app import tenancy
+from app.db import DEFAULT_SHARD, get_db, settings
+
+COURTS = {
+    settings.DEFAULT_COURT: tenancy.CourtRoute(settings.DEFAULT_COURT, DEFAULT_SHARD, "active"),
+    "forum-mall": tenancy.CourtRoute("forum-mall", DEFAULT_SHARD, "active"),
+}
+
+class Payload(BaseModel):
+    user_token: str
+
+app = FastAPI()
+
+@app.post("/cart/add")
+def add(payload: Payload, db: Session = Depends(get_db)):
+    return {"court": db.info["court_id"], "user_token": payload.user_token}
+
+@app.get("/cart")
+def get(user_token: str, db: Session = Depends(get_db)):
+    return {"court": db.info["court_id"]}
+
+@pytest.fixture(autouse=True)
+def fixed_directory(monkeypatch):
+    monkeypatch.setattr(tenancy, "lookup_court", COURTS.get)
+
+def _send(method: str, path: str, body: dict | None = None, headers: dict[str, str] | None = None,
+          query: str = "") -> tuple[int, dict]:
+    raw = json.dumps(body).encode() if body is not None else b""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "scheme": "http",
+        "query_string": query.encode(),
+        "headers": [(b"content-type", b"application/json"), (b"host", b"testserver")]
+                   + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("10.0.0.1", 40000),
+        "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    payload = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, json.loads(payload)
+
+def test_body_token_routes_write_to_its_court():
+    status, out = _send("POST", "/cart/add", {"user_token": "forum-mall~user-7-abc123"})
+    assert status == 200
+    assert out["court"] == "forum-mall"
+
+def test_unprefixed_user_token_belongs_to_default_court():
+    status, out = _send("POST", "/cart/add", {"user_token": "user-7-abc123"})
+    assert (status, out["court"]) == (200, settings.DEFAULT_COURT)
+
+def test_guest_token_follows_header_court():
+    status, out = _send("POST", "/cart/add", {"user_token": "guest-1f2e"}, headers={"X-Court-Id": "forum-mall"})
+    assert (status, out["court"]) == (200, "forum-mall")
+
+def test_court_contradicting_token_is_refused():
+    status, out = _send("POST", "/cart/add", {"user_token": "forum-mall~user-7-abc123"},
+                        headers={"X-Court-Id": settings.DEFAULT_COURT})
+    assert status == 400
+    status, _ = _send("GET", "/cart", query="user_token=user-7-abc123&court=forum-mall")
+    assert status == 400